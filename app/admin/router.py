@@ -1,33 +1,43 @@
 # app/admin/router.py - FIXED (remove email field)
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Header
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Product,Order
+import logging
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_read_db, get_write_db, engine, pool_stats, read_session, replica_stats
+from app import migrations
+from app.models import Product,Order,DailySales
+from app.schemas import BulkOrderTransition
 import os
-from app.cloudinary_setup import upload_to_cloudinary, delete_from_cloudinary
-from app.email import send_order_confirmation_email 
-from sqlalchemy import text
-from fastapi import BackgroundTasks
-from typing import Optional
+from app.cloudinary_setup import upload_to_cloudinary, delete_from_cloudinary, validate_image_upload
+from app.core.security import require_role
+from app.jobs import enqueue, enqueue_many
+from app.jobs.handlers import order_confirmation_payload
+from app.jobs.queue import queue_stats
+from app.jobs.worker import worker_stats
+from app.orders.serializers import serialize_order
+from app.orders.rollup import record_order_change, record_order_changes, snapshot
+from app.orders.stock import commit_hold, release_stock
+from app.products.cache import catalog_cache, serialize_product
+from app.products.importer import import_products, parse_manifest
+from sqlalchemy import case, func, select, text, update
+from fastapi import Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+import asyncio
+import base64
+import csv
+import io
+import json
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # -----------------------------
-# SIMPLE AUTH
+# AUTH
 # -----------------------------
-def admin_required(authorization: str = Header(None)):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="No authorization header")
-    
-    if authorization.startswith("Bearer "):
-        token = authorization.split("Bearer ")[1]
-    else:
-        token = authorization
-    
-    if not token:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    return {"email": "admin@ekabhumi.com", "role": "admin"}
+# Verified HS256 token with role=admin (signature checks cached per token)
+admin_required = require_role("admin")
 
 # -----------------------------
 # CREATE PRODUCT - WITHOUT EMAIL
@@ -47,17 +57,23 @@ async def create_product(
     quantity: int = Form(0),
     image: UploadFile = File(...),      # Primary image (Required)
     image2: UploadFile = File(None),    # ✅ NEW: Second image (Optional)
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     admin=Depends(admin_required)
 ):
     try:
-        # 1. Upload Primary Image
-        image_url = await upload_to_cloudinary(image, folder="ekabhumi/products")
-        
-        # 2. ✅ NEW: Upload Second Image if provided
-        image2_url = None
+        # 1. Reject bad files before anything is uploaded
+        for upload in (image, image2):
+            if upload:
+                validate_image_upload(upload)
+
+        # 2. Upload primary and (optional) second image concurrently
+        uploads = [upload_to_cloudinary(image, folder="ekabhumi/products")]
         if image2:
-            image2_url = await upload_to_cloudinary(image2, folder="ekabhumi/products")
+            uploads.append(upload_to_cloudinary(image2, folder="ekabhumi/products"))
+        urls = await asyncio.gather(*uploads)
+
+        image_url = urls[0]
+        image2_url = urls[1] if image2 else None
         
         # 3. Create product
         product = Product(
@@ -71,8 +87,9 @@ async def create_product(
         )
         
         db.add(product)
-        db.commit()
-        db.refresh(product)
+        await db.commit()
+        await db.refresh(product)
+        catalog_cache.bump()
         
         return {
             "status": "success", 
@@ -88,64 +105,78 @@ async def create_product(
                 "image2_url": product.image2_url # ✅ Return it
             }
         }
+    except HTTPException: raise
     except Exception as e:
-        print(f"Error creating product: {e}")
+        logger.exception("Error creating product")
         raise HTTPException(status_code=500, detail=f"Failed to create product: {str(e)}")
 
+# -----------------------------
+# BULK IMPORT PRODUCTS
+# -----------------------------
+@router.post("/products/import")
+async def import_products_endpoint(
+    manifest: UploadFile = File(...),      # products.csv or products.json
+    images: UploadFile = File(None),       # Optional zip; rows reference files via image / image2
+    db: AsyncSession = Depends(get_write_db),
+    admin=Depends(admin_required)
+):
+    rows = parse_manifest(manifest.filename or "", await manifest.read())
+    try:
+        result = await import_products(db, rows, images)
+    except HTTPException: raise
+    except Exception as e:
+        logger.exception("Error importing products")
+        raise HTTPException(status_code=500, detail=f"Failed to import products: {str(e)}")
+
+    if result["summary"]["created"] or result["summary"]["updated"]:
+        catalog_cache.bump()
+    return result
+
 # -----------------------------
 # GET ADMIN PRODUCTS
 # -----------------------------
 @router.get("/admin-products")
-def get_admin_products(db: Session = Depends(get_db), admin=Depends(admin_required)):
+async def get_admin_products(db: AsyncSession = Depends(get_read_db), admin=Depends(admin_required)):
     try:
-        products = db.query(Product).order_by(Product.priority.asc()).all()
-        if not products: return []
-        
-        result = []
-        for product in products:
-            result.append({
-                "id": product.id,
-                "name": product.name,
-                "price": float(product.price) if product.price else 0.0,
-                "description": product.description or "",
-                "image_url": product.image_url or "",
-                
-                # ✅ NEW: Include image2
-                "image2_url": product.image2_url or "",
-                
-                "quantity": int(product.quantity or 0),
-                "priority": product.priority or 100
-            })
-        return result
-    except Exception as e:
-        print(f"Error fetching admin products: {e}")
+        products = (await db.execute(select(Product).order_by(Product.priority.asc()))).scalars().all()
+        return ORJSONResponse([serialize_product(product) for product in products])
+    except Exception:
+        logger.exception("Error fetching admin products")
         return []
 
+# -----------------------------
+# CATALOG CACHE STATS (per worker)
+# -----------------------------
+@router.get("/catalog-cache")
+def get_catalog_cache_stats(admin=Depends(admin_required)):
+    return catalog_cache.stats()
+
 # -----------------------------
 # DELETE PRODUCT
 # -----------------------------
 @router.delete("/delete-product/{product_id}")
-async def delete_product(product_id: int, db: Session = Depends(get_db), admin=Depends(admin_required)):
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_write_db), admin=Depends(admin_required)):
     try:
-        product = db.query(Product).filter(Product.id == product_id).first()
+        product = await db.get(Product, product_id)
         if not product: raise HTTPException(status_code=404, detail="Product not found")
         
         # Delete primary image
         if product.image_url and "cloudinary.com" in product.image_url:
             try: await delete_from_cloudinary(product.image_url)
-            except Exception as e: print("Cloudinary delete 1 failed:", e)
+            except Exception as e: logger.warning("Cloudinary delete 1 failed: %s", e)
 
         # ✅ NEW: Delete secondary image if exists
         if product.image2_url and "cloudinary.com" in product.image2_url:
             try: await delete_from_cloudinary(product.image2_url)
-            except Exception as e: print("Cloudinary delete 2 failed:", e)
+            except Exception as e: logger.warning("Cloudinary delete 2 failed: %s", e)
         
-        db.delete(product)
-        db.commit()
+        await db.delete(product)
+        await db.commit()
+        catalog_cache.bump()
         return {"message": f"Product {product_id} deleted successfully"}
     except HTTPException: raise
     except Exception as e:
-        print(f"Error deleting product: {e}")
+        logger.exception("Error deleting product")
         raise HTTPException(status_code=500, detail=f"Failed to delete product: {str(e)}")
 
 # -----------------------------
@@ -165,11 +196,11 @@ async def update_product(
     # ✅ NEW: Optional second image replace
     image2: Optional[UploadFile] = File(None),
 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     admin=Depends(admin_required)
 ):
     try:
-        product = db.query(Product).filter(Product.id == product_id).first()
+        product = await db.get(Product, product_id)
         if not product: raise HTTPException(status_code=404, detail="Product not found")
 
         # Update standard fields
@@ -179,24 +210,30 @@ async def update_product(
         if priority is not None: product.priority = priority
         if quantity is not None: product.quantity = quantity
 
-        # Update Primary Image
-        if image is not None:
-            if product.image_url and "cloudinary.com" in product.image_url:
-                try: await delete_from_cloudinary(product.image_url)
-                except Exception as e: print("Cloudinary delete 1 failed:", e)
-            new_url = await upload_to_cloudinary(image, folder="ekabhumi/products")
-            product.image_url = new_url
+        # Reject bad files before any old image is deleted
+        for upload in (image, image2):
+            if upload is not None:
+                validate_image_upload(upload)
 
-        # ✅ NEW: Update Second Image
+        # Replace primary and second image concurrently
+        async def replace_image(old_url, upload, label):
+            if old_url and "cloudinary.com" in old_url:
+                try: await delete_from_cloudinary(old_url)
+                except Exception as e: logger.warning("Cloudinary delete %s failed: %s", label, e)
+            return await upload_to_cloudinary(upload, folder="ekabhumi/products")
+
+        replacements = {}
+        if image is not None:
+            replacements["image_url"] = replace_image(product.image_url, image, 1)
         if image2 is not None:
-            if product.image2_url and "cloudinary.com" in product.image2_url:
-                try: await delete_from_cloudinary(product.image2_url)
-                except Exception as e: print("Cloudinary delete 2 failed:", e)
-            new_url2 = await upload_to_cloudinary(image2, folder="ekabhumi/products")
-            product.image2_url = new_url2
+            replacements["image2_url"] = replace_image(product.image2_url, image2, 2)
+        new_urls = await asyncio.gather(*replacements.values())
+        for field, url in zip(replacements, new_urls):
+            setattr(product, field, url)
 
-        db.commit()
-        db.refresh(product)
+        await db.commit()
+        await db.refresh(product)
+        catalog_cache.bump()
 
         return {
             "status": "success",
@@ -212,7 +249,7 @@ async def update_product(
         }
     except HTTPException: raise
     except Exception as e:
-        print(f"Error updating product: {e}")
+        logger.exception("Error updating product")
         raise HTTPException(status_code=500, detail=f"Failed to update product: {str(e)}")
 
 # -----------------------------
@@ -224,60 +261,138 @@ async def update_product(
 # -----------------------------
 # GET ALL ORDERS (Admin)
 # -----------------------------
-@router.get("/orders")
-def get_admin_orders(db: Session = Depends(get_db), admin=Depends(admin_required)):
+ORDERS_PAGE_SIZE_DEFAULT = int(os.getenv("ADMIN_ORDERS_PAGE_SIZE", "50"))
+ORDERS_PAGE_SIZE_MAX = 500
+
+
+def order_filters(
+    status: Optional[str] = Query(None),
+    payment_status: Optional[str] = Query(None),
+    customer_email: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+) -> List:
+    """Shared admin order filters, returned as SQLAlchemy WHERE clauses."""
+    conditions = []
+    if status:
+        conditions.append(Order.status == status)
+    if payment_status:
+        conditions.append(Order.payment_status == payment_status)
+    if customer_email:
+        conditions.append(Order.customer_email == customer_email)
+    if date_from:
+        conditions.append(Order.order_date >= date_from)
+    if date_to:
+        conditions.append(Order.order_date < date_to)
+    return conditions
+
+
+def encode_cursor(order_id: int) -> str:
+    return base64.urlsafe_b64encode(str(order_id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
     try:
-        orders = db.query(Order).order_by(Order.id.desc()).all()
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/orders")
+async def get_admin_orders(
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(ORDERS_PAGE_SIZE_DEFAULT, ge=1, le=ORDERS_PAGE_SIZE_MAX),
+    filters: List = Depends(order_filters),
+    db: AsyncSession = Depends(get_read_db),
+    admin=Depends(admin_required),
+):
+    """Newest first, keyset-paginated on Order.id; pass next_cursor back as cursor."""
+    query = select(Order).where(*filters)
+    if cursor:
+        query = query.where(Order.id < decode_cursor(cursor))
+
+    # Fetch one extra row to know whether another page exists
+    orders = (await db.execute(query.order_by(Order.id.desc()).limit(limit + 1))).scalars().all()
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+
+    return ORJSONResponse({
+        "items": [serialize_order(o) for o in orders],
+        "next_cursor": encode_cursor(orders[-1].id) if has_more else None,
+        "limit": limit,
+    })
 
-        result = []
-        for o in orders:
-            result.append({
-                "id": o.id,
-                "product_id": o.product_id,
-                "product_name": o.product_name,
-                "quantity": o.quantity,
-                "unit_price": float(o.unit_price),
-                "total_amount": float(o.total_amount),
-                "customer_name": o.customer_name,
-                "customer_email": o.customer_email,
-                "customer_phone": o.customer_phone,
-                "shipping_address": o.shipping_address,
-                "notes": o.notes,
-                "status": o.status,
-                "payment_status": o.payment_status,
-                "order_date": o.order_date.isoformat() if o.order_date else None,
-                "updated_at": o.updated_at.isoformat() if o.updated_at else None,
-            })
-
-        return result
-    except Exception as e:
-     print(f"Error fetching admin products: {e}")
-    raise HTTPException(status_code=500, detail="Failed to fetch admin products")
 
 
 
 # -----------------------------
-# TEMP: RESET ORDERS TABLE (Drops old schema)
+# EXPORT ORDERS (streamed)
 # -----------------------------
-@router.post("/reset-orders-table")
-def reset_orders_table(db: Session = Depends(get_db), admin=Depends(admin_required)):
-    """
-    WARNING: Deletes ALL orders. Use once to fix schema mismatch on SQLite.
-    After successful reset, REMOVE this endpoint.
-    """
-    db.execute(text("DROP TABLE IF EXISTS orders"))
-    db.commit()
-    return {"status": "ok", "message": "orders table dropped. Restart service to recreate it."}
+EXPORT_BATCH_SIZE = int(os.getenv("ORDERS_EXPORT_BATCH_SIZE", "1000"))
+EXPORT_COLUMNS = [
+    "id", "product_id", "product_name", "quantity", "unit_price", "total_amount",
+    "customer_name", "customer_email", "customer_phone", "shipping_address",
+    "notes", "status", "payment_status", "payment_request_id", "payment_id",
+    "order_date", "updated_at",
+]
+
+
+async def _stream_orders(filters: List, fmt: str):
+    # Own session: the request-scoped one may be closed before streaming ends
+    async with read_session() as db:
+        stmt = (
+            select(Order)
+            .where(*filters)
+            .order_by(Order.id.asc())
+            .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
 
+        result = await db.stream(stmt)
+        async for partition in result.scalars().partitions():
+            for o in partition:
+                row = serialize_order(o)
+                if writer:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(row))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+@router.get("/orders/export")
+async def export_orders(
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    filters: List = Depends(order_filters),
+    admin=Depends(admin_required),
+):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"orders-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(
+        _stream_orders(filters, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @router.post("/orders/{order_id}/approve")
-def approve_order(
+async def approve_order(
     order_id: int,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     admin=Depends(admin_required)
 ):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    # Order row first, as in the payment and sweeper paths (see app/orders/stock.py)
+    order = await db.get(Order, order_id, with_for_update=True, populate_existing=True)
 
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -285,20 +400,15 @@ def approve_order(
     if order.status == "confirmed":
         return {"message": "Order already confirmed"}
 
+    before = snapshot(order)
     order.status = "confirmed"
     order.payment_status = "paid"
-    db.commit()
-    db.refresh(order)
-
-    # 🔔 Send email in background (non-blocking)
-    background_tasks.add_task(
-        send_order_confirmation_email,
-        to_email=order.customer_email,
-        customer_name=order.customer_name,
-        order_id=order.id,
-        product_name=order.product_name,
-        total_amount=order.total_amount,
-    )
+    await record_order_change(db, before, snapshot(order))
+    await commit_hold(db, order)
+    # 🔔 Email goes through the jobs outbox, committed with the status change
+    enqueue(db, "order_confirmation_email", **order_confirmation_payload(order))
+    await db.commit()
+    await db.refresh(order)
 
     return {
         "status": "success",
@@ -306,12 +416,216 @@ def approve_order(
         "order_id": order.id,
     }
 
-@router.post("/reset-products-table")
-def reset_products_table(db: Session = Depends(get_db), admin=Depends(admin_required)):
-    # WARNING: THIS DELETES ALL PRODUCTS
-    db.execute(text("DROP TABLE IF EXISTS products"))
-    db.commit()
-    # The table will be recreated automatically next time you restart the app 
-    # (if you have base.metadata.create_all(bind=engine) in your main.py)
-    return {"message": "Products table dropped. Restart backend to recreate."}
 
+# -----------------------------
+# BULK STATUS TRANSITIONS
+# -----------------------------
+# target -> states it may be reached from
+STATUS_TRANSITIONS = {
+    "confirmed": {"pending"},
+    "shipped": {"confirmed"},
+    "delivered": {"shipped"},
+    "cancelled": {"pending", "confirmed"},
+}
+PAYMENT_STATUS_TRANSITIONS = {
+    "paid": {"pending", "failed"},
+    "failed": {"pending"},
+}
+BULK_MAX_IDS = int(os.getenv("ADMIN_BULK_MAX_IDS", "5000"))
+
+
+@router.post("/orders/bulk-status")
+async def bulk_update_order_status(
+    body: BulkOrderTransition,
+    filters: List = Depends(order_filters),
+    db: AsyncSession = Depends(get_write_db),
+    admin=Depends(admin_required)
+):
+    if not body.status and not body.payment_status:
+        raise HTTPException(status_code=400, detail="Provide status and/or payment_status")
+    if body.status and body.status not in STATUS_TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported status '{body.status}'")
+    if body.payment_status and body.payment_status not in PAYMENT_STATUS_TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported payment_status '{body.payment_status}'")
+
+    conditions = list(filters)
+    if body.order_ids is not None:
+        if len(body.order_ids) > BULK_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_IDS} order_ids per call")
+        conditions.append(Order.id.in_(body.order_ids))
+    elif not conditions:
+        raise HTTPException(status_code=400, detail="Provide order_ids or at least one filter")
+
+    values = {"updated_at": datetime.utcnow()}
+    if body.status:
+        conditions.append(Order.status.in_(STATUS_TRANSITIONS[body.status]))
+        values["status"] = body.status
+    if body.payment_status:
+        conditions.append(Order.payment_status.in_(PAYMENT_STATUS_TRANSITIONS[body.payment_status]))
+        values["payment_status"] = body.payment_status
+    if body.payment_status == "paid":
+        # A cancelled order marked paid would take its stock again but stay cancelled
+        conditions.append(Order.status.is_distinct_from("cancelled"))
+
+    # Lock the matching rows and keep their current rollup keys, then one
+    # set-based UPDATE; rows not in an allowed "from" state are left alone
+    matching = (await db.execute(
+        select(Order.id, Order.order_date, Order.product_id, Order.product_name, Order.status,
+               Order.payment_status, Order.quantity, Order.total_amount)
+        .where(*conditions)
+        .with_for_update()
+    )).all()
+    before = {row.id: snapshot(row) for row in matching}
+
+    updated = []
+    if before:
+        result = await db.execute(
+            update(Order)
+            .where(Order.id.in_(list(before)), *conditions)
+            .values(**values)
+            .returning(Order.id, Order.customer_email, Order.customer_name, Order.product_name,
+                       Order.total_amount, Order.order_date, Order.product_id, Order.status,
+                       Order.payment_status, Order.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        updated = result.all()
+        await record_order_changes(db, [(before[o.id], snapshot(o)) for o in updated])
+        if body.status == "cancelled":
+            await release_stock(db, [o.id for o in updated], statuses=("held", "committed"))
+        elif body.status == "confirmed" or body.payment_status == "paid":
+            # Keep held stock (or take it again for orders whose hold lapsed)
+            for o in sorted(updated, key=lambda o: o.product_id):
+                await commit_hold(db, o)
+
+    if body.status == "confirmed":
+        enqueue_many(db, "order_confirmation_email", [order_confirmation_payload(o) for o in updated])
+    elif body.status:
+        enqueue_many(db, "order_status_email", [
+            {
+                "to_email": o.customer_email,
+                "customer_name": o.customer_name,
+                "order_id": o.id,
+                "product_name": o.product_name,
+                "status": body.status,
+            }
+            for o in updated
+        ])
+    await db.commit()
+
+    updated_ids = sorted(o.id for o in updated)
+    response = {"status": "success", "updated": updated_ids, "updated_count": len(updated_ids)}
+    if body.order_ids is not None:
+        response["skipped"] = sorted(set(body.order_ids) - set(updated_ids))
+    return response
+
+
+# -----------------------------
+# SALES DASHBOARD
+# -----------------------------
+@router.get("/stats")
+async def get_sales_stats(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    top: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    admin=Depends(admin_required)
+):
+    """Reads only the daily_sales rollup, so cost depends on the range, not on order history."""
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    in_range = (DailySales.day >= date_from, DailySales.day <= date_to)
+    paid = DailySales.payment_status == "paid"
+
+    daily = (await db.execute(
+        select(
+            DailySales.day,
+            func.sum(DailySales.order_count),
+            func.sum(case((paid, DailySales.order_count), else_=0)),
+            func.sum(case((paid, DailySales.revenue), else_=0.0)),
+        )
+        .where(*in_range)
+        .group_by(DailySales.day)
+        .order_by(DailySales.day)
+    )).all()
+    by_status = (await db.execute(
+        select(DailySales.status, func.sum(DailySales.order_count))
+        .where(*in_range).group_by(DailySales.status)
+    )).all()
+    by_payment_status = (await db.execute(
+        select(DailySales.payment_status, func.sum(DailySales.order_count))
+        .where(*in_range).group_by(DailySales.payment_status)
+    )).all()
+    top_products = (await db.execute(
+        select(
+            DailySales.product_id,
+            func.max(DailySales.product_name),
+            func.sum(DailySales.units),
+            func.sum(DailySales.revenue),
+        )
+        .where(*in_range, paid)
+        .group_by(DailySales.product_id)
+        .order_by(func.sum(DailySales.revenue).desc())
+        .limit(top)
+    )).all()
+
+    return ORJSONResponse({
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "total_orders": sum(row[1] or 0 for row in daily),
+        "total_revenue": round(sum(row[3] or 0.0 for row in daily), 2),
+        "daily": [
+            {"day": str(day), "orders": orders or 0, "paid_orders": paid_orders or 0, "revenue": round(revenue or 0.0, 2)}
+            for day, orders, paid_orders, revenue in daily
+        ],
+        "by_status": {status: count for status, count in by_status if count},
+        "by_payment_status": {status: count for status, count in by_payment_status if count},
+        "top_products": [
+            {"product_id": pid, "product_name": name, "units": units or 0, "revenue": round(revenue or 0.0, 2)}
+            for pid, name, units, revenue in top_products
+        ],
+    })
+
+
+# -----------------------------
+# JOBS QUEUE
+# -----------------------------
+@router.get("/jobs")
+async def get_jobs_stats(db: AsyncSession = Depends(get_write_db), admin=Depends(admin_required)):
+    return {**(await queue_stats(db)), "worker": {"pid": os.getpid(), **worker_stats}}
+
+
+# -----------------------------
+# SCHEMA MIGRATIONS
+# -----------------------------
+@router.get("/schema")
+async def get_schema_status(admin=Depends(admin_required)):
+    async with engine.connect() as conn:
+        return await conn.run_sync(migrations.status)
+
+
+@router.post("/schema/upgrade")
+async def upgrade_schema(admin=Depends(admin_required)):
+    async with engine.begin() as conn:
+        applied = await conn.run_sync(migrations.upgrade)
+        result = await conn.run_sync(migrations.status)
+    return {"status": "ok", "applied": applied, **result}
+
+
+# -----------------------------
+# DB POOL
+# -----------------------------
+@router.get("/db/pool")
+async def get_db_pool(db: AsyncSession = Depends(get_write_db), admin=Depends(admin_required)):
+    """Pool of the worker that served this request, plus server-wide connection counts on Postgres."""
+    result = {"pool": pool_stats(), "replicas": replica_stats()}
+    if db.bind.dialect.name == "postgresql":
+        max_connections = (await db.execute(text("SHOW max_connections"))).scalar()
+        by_state = (await db.execute(text(
+            "SELECT coalesce(state, 'unknown'), count(*) FROM pg_stat_activity"
+            " WHERE datname = current_database() GROUP BY 1"
+        ))).all()
+        result["server"] = {
+            "max_connections": int(max_connections),
+            "connections": {state: n for state, n in by_state},
+        }
+    return result
@@ -0,0 +1,94 @@
+# app/auth/google.py - Google ID token verification against a cached JWKS
+#
+# Google rotates its signing keys every few days and publishes them with a
+# Cache-Control max-age. Keys are kept in memory until that expires; a token
+# signed with an unknown kid triggers one refresh (throttled), which is how
+# rotation is picked up without fetching certificates on every login.
+import asyncio
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+# httpx and python-jose are imported inside the functions that use them, so
+# they load on the first Google sign-in rather than during cold start
+
+GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+JWKS_DEFAULT_MAX_AGE = int(os.getenv("GOOGLE_JWKS_DEFAULT_MAX_AGE", "3600"))
+JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("GOOGLE_JWKS_MIN_REFRESH_INTERVAL", "60"))
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+# Returns (jwks document, max_age seconds or None)
+JwksFetcher = Callable[[], Awaitable[Tuple[dict, Optional[int]]]]
+
+
+async def fetch_google_jwks(url: str = GOOGLE_JWKS_URL) -> Tuple[dict, Optional[int]]:
+    import httpx
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(5.0)) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+    match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+    return response.json(), int(match.group(1)) if match else None
+
+
+class GoogleTokenVerifier:
+    """Pass `fetcher` returning a fixture key set to verify tokens fully offline."""
+
+    def __init__(self, client_id: str, fetcher: Optional[JwksFetcher] = None):
+        self.client_id = client_id
+        self.fetcher = fetcher or fetch_google_jwks
+        self._keys: Dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._last_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+
+    async def _refresh(self, force: bool):
+        async with self._lock:
+            now = time.monotonic()
+            # Another caller refreshed while we waited for the lock
+            if now < self._expires_at and not force:
+                return
+            if force and now - self._last_refresh < JWKS_MIN_REFRESH_INTERVAL:
+                return
+            jwks, max_age = await self.fetcher()
+            self._keys = {key["kid"]: key for key in jwks.get("keys", []) if "kid" in key}
+            self._last_refresh = now
+            self._expires_at = now + (max_age if max_age is not None else JWKS_DEFAULT_MAX_AGE)
+            self.refreshes += 1
+
+    async def _signing_key(self, kid: str) -> dict:
+        if time.monotonic() >= self._expires_at:
+            await self._refresh(force=False)
+        if kid not in self._keys:
+            # Unknown kid: Google may have rotated before our max-age ran out
+            await self._refresh(force=True)
+        key = self._keys.get(kid)
+        if key is None:
+            from jose import JWTError
+
+            raise JWTError(f"Unknown signing key {kid}")
+        return key
+
+    async def verify(self, token: str) -> dict:
+        """Return the ID token's claims; raises JWTError if it isn't a valid token for this client."""
+        from jose import JWTError, jwt
+
+        header = jwt.get_unverified_header(token)
+        if header.get("alg") != "RS256" or not header.get("kid"):
+            raise JWTError("Unexpected token header")
+        key = await self._signing_key(header["kid"])
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=self.client_id,
+            issuer=GOOGLE_ISSUERS,
+            options={"verify_at_hash": False},
+        )
+        if not claims.get("email") or claims.get("email_verified") not in (True, "true"):
+            raise JWTError("Google account email is not verified")
+        return claims
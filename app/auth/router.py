@@ -1,78 +1,57 @@
-# app/auth/router.py - UPDATED (accept any token for testing)
-from fastapi import APIRouter
+# app/auth/router.py - Google sign-in, exchanged for our own access token
+import logging
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-import jwt
 import os
-from datetime import datetime, timedelta
+
+from app.auth.google import GoogleTokenVerifier
+from app.core.config import ADMIN_EMAILS, GOOGLE_CLIENT_ID
+from app.core.security import create_access_token
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Development shortcut: "test-admin-token" / "test-user-token" log in without Google
+ALLOW_TEST_TOKENS = os.getenv("AUTH_ALLOW_TEST_TOKENS", "0") == "1"
+TEST_TOKENS = {
+    "test-admin-token": "athuldev743@gmail.com",
+    "test-user-token": "user@example.com",
+}
+
+google_verifier = GoogleTokenVerifier(GOOGLE_CLIENT_ID)
+
+
 class GoogleTokenRequest(BaseModel):
     token: str
 
+
 @router.post("/google")
-def google_login(request: GoogleTokenRequest):
-    try:
-        print(f"Auth request received, token length: {len(request.token)}")
-        
-        # For development/testing, accept ANY token
-        SECRET_KEY = os.getenv("SECRET_KEY", "test-secret-key-for-development")
-        
-        # Try to decode if it looks like a JWT
-        email = "test@example.com"
-        role = "user"
-        
-        if len(request.token) > 100:
-            # Might be a real Google token
-            try:
-                # Try to decode as JWT (without verification for testing)
-                decoded = jwt.decode(request.token, options={"verify_signature": False})
-                email = decoded.get("email") or decoded.get("sub") or "user@example.com"
-            except:
-                email = "user@example.com"
-        else:
-            # Short token, probably test token
-            if request.token == "test-admin-token":
-                email = "athuldev743@gmail.com"
-                role = "admin"
-            elif request.token == "test-user-token":
-                email = "user@example.com"
-                role = "user"
-            else:
-                email = f"{request.token}@example.com"
-        
-        # Check if admin
-        ADMIN_EMAILS = ["athuldev743@gmail.com"]
-        if email in ADMIN_EMAILS:
-            role = "admin"
-        
-        # Create JWT token
-        jwt_token = jwt.encode(
-            {
-                "sub": email,
-                "role": role,
-                "email": email,
-                "exp": datetime.utcnow() + timedelta(hours=24)
-            },
-            SECRET_KEY,
-            algorithm="HS256"
-        )
-        
-        print(f"Generated JWT for {email} as {role}")
-        
-        return {
-            "access_token": jwt_token,
-            "token_type": "bearer",
-            "role": role,
-            "email": email
-        }
-        
-    except Exception as e:
-        print(f"Error in google_login: {str(e)}")
-        # Always return a valid response for testing
-        return {
-            "access_token": "mock.jwt.token.for.testing",
-            "token_type": "bearer", 
-            "role": "admin",
-            "email": "athuldev743@gmail.com"
-        }
\ No newline at end of file
+async def google_login(request: GoogleTokenRequest):
+    from jose import JWTError
+
+    if ALLOW_TEST_TOKENS and request.token in TEST_TOKENS:
+        email = TEST_TOKENS[request.token]
+    else:
+        try:
+            claims = await google_verifier.verify(request.token)
+        except JWTError as e:
+            logger.info("Google token rejected: %s", e)
+            raise HTTPException(status_code=401, detail="Invalid Google token")
+        except Exception:
+            logger.exception("Error verifying Google token")
+            raise HTTPException(status_code=503, detail="Could not verify Google token")
+        email = claims["email"]
+
+    email = email.lower()
+    role = "admin" if email in ADMIN_EMAILS else "user"
+    jwt_token = create_access_token({"sub": email, "email": email, "role": role})
+
+    logger.info("Login", extra={"email": email, "role": role})
+
+    return {
+        "access_token": jwt_token,
+        "token_type": "bearer",
+        "role": role,
+        "email": email
+    }
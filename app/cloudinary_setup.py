@@ -1,63 +1,149 @@
 # app/cloudinary_setup.py
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
-from fastapi import UploadFile
+import logging
+from fastapi import HTTPException, UploadFile
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import os
+import time
+
+from app.core.metrics import EXTERNAL_CALL_LATENCY, timed
+
+logger = logging.getLogger(__name__)
+
+_configured = False
+
+
+def _uploader():
+    """The SDK is imported and configured on first upload/delete, not during cold start."""
+    global _configured
+    import cloudinary
+    import cloudinary.uploader
+
+    if not _configured:
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+            # Only set to point uploads at a local fake (bench/fakes.py); default is api.cloudinary.com
+            upload_prefix=os.getenv("CLOUDINARY_UPLOAD_PREFIX") or None,
+        )
+        _configured = True
+    return cloudinary.uploader
+
+# The Cloudinary SDK is blocking; run it on a small dedicated pool so uploads
+# never stall the event loop or starve the default thread pool.
+CLOUDINARY_WORKERS = int(os.getenv("CLOUDINARY_WORKERS", "4"))
+_executor = ThreadPoolExecutor(max_workers=CLOUDINARY_WORKERS, thread_name_prefix="cloudinary")
+
+# Uploads are streamed from the spooled temp file in chunks (Cloudinary's
+# minimum chunk is 5MB), so at most one chunk is held in memory per upload.
+MAX_IMAGE_UPLOAD_BYTES = int(os.getenv("MAX_IMAGE_UPLOAD_MB", "10")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = int(os.getenv("CLOUDINARY_CHUNK_MB", "6")) * 1024 * 1024
+
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "image/jpeg",
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"GIF87a": "image/gif",
+    b"GIF89a": "image/gif",
+}
+
+
+def sniff_image_type(head: bytes):
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def validate_image_upload(file: UploadFile) -> int:
+    """Check size and magic bytes without reading the body into memory; returns the size."""
+    f = file.file
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size == 0:
+        raise HTTPException(status_code=400, detail=f"{file.filename}: empty file")
+    if size > MAX_IMAGE_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{file.filename}: image exceeds {MAX_IMAGE_UPLOAD_BYTES // (1024 * 1024)}MB limit",
+        )
+
+    f.seek(0)
+    head = f.read(12)
+    f.seek(0)
+    if sniff_image_type(head) is None:
+        raise HTTPException(status_code=415, detail=f"{file.filename}: unsupported image type")
+    return size
+
+
+async def _run_blocking(label: str, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        # label is "<operation> <target>"; only the operation becomes a metric label
+        with timed(EXTERNAL_CALL_LATENCY, "cloudinary", label.split(" ", 1)[0]):
+            return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info("Cloudinary %s took %.0fms", label, elapsed_ms)
+
+
+async def run_on_upload_pool(fn, *args):
+    """Blocking work that feeds an upload (e.g. unzipping the image) runs on the upload pool too."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, functools.partial(fn, *args))
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
 
 async def upload_to_cloudinary(file: UploadFile, folder: str = "ekabhumi/products") -> str:
+    validate_image_upload(file)
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Upload file to Cloudinary
-        result = cloudinary.uploader.upload(
-            file_content,
+        # Stream the spooled file to Cloudinary chunk by chunk
+        result = await _run_blocking(
+            f"upload {file.filename}",
+            _uploader().upload_large,
+            file.file,
+            filename=file.filename,
+            chunk_size=UPLOAD_CHUNK_SIZE,
             folder=folder,
             public_id=file.filename.split('.')[0],
             overwrite=True,
             resource_type="auto"
         )
-        
+
         # Return the secure URL
         return result.get("secure_url", "")
     except Exception as e:
-        print(f"Cloudinary upload error: {e}")
+        logger.exception("Cloudinary upload error")
         raise e
 
 async def delete_from_cloudinary(image_url: str) -> bool:
     try:
         if not image_url:
             return True
-            
+
         # Extract public_id from Cloudinary URL
         # Example: https://res.cloudinary.com/cloudname/image/upload/v1234567/folder/filename.jpg
         if "cloudinary.com" not in image_url:
             return True
-            
+
         # Get the path after /upload/
         upload_index = image_url.find("/upload/") + 8
         path_with_version = image_url[upload_index:]
-        
+
         # Remove version if present (v1234567/)
         if path_with_version.startswith("v"):
             path_without_version = "/".join(path_with_version.split("/")[1:])
         else:
             path_without_version = path_with_version
-        
+
         # Remove file extension
         public_id = path_without_version.split(".")[0]
-        
+
         # Delete from Cloudinary
-        result = cloudinary.uploader.destroy(public_id)
+        result = await _run_blocking(f"delete {public_id}", _uploader().destroy, public_id)
         return result.get("result") == "ok"
-    except Exception as e:
-        print(f"Cloudinary delete error: {e}")
-        return False
\ No newline at end of file
+    except Exception:
+        logger.exception("Cloudinary delete error")
+        return False
@@ -7,6 +7,13 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+# Comma-separated; these Google accounts get the admin role at login
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.getenv("ADMIN_EMAILS", ADMIN_EMAIL or "athuldev743@gmail.com").split(",")
+    if email.strip()
+}
+
 if not GOOGLE_CLIENT_ID:
     raise RuntimeError("GOOGLE_CLIENT_ID not set")
 
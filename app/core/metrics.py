@@ -0,0 +1,128 @@
+# app/core/metrics.py - Prometheus metrics, aggregated across uvicorn workers
+#
+# With PROMETHEUS_MULTIPROC_DIR set (the Dockerfile does), every worker writes
+# its samples to mmap'd files in that directory and /metrics merges all of
+# them, so a scrape sees the whole container whichever worker answers it.
+# Without it (local single-process runs) the default registry is used.
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Request latency buckets sized for an API whose budget is ~100ms-1s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to produce the full response", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests currently being handled", ["method"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection",
+    buckets=POOL_WAIT_BUCKETS,
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured pool size", multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently in use", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond pool_size", multiprocess_mode="livesum")
+
+EXTERNAL_CALL_LATENCY = Histogram(
+    "external_call_duration_seconds", "Outbound calls to third-party services", ["service", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+BACKGROUND_TASK_LATENCY = Histogram(
+    "background_task_duration_seconds", "Background job and sweeper run time", ["task", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class timed:
+    """`with timed(HISTOGRAM, a, b):` observes elapsed seconds with labels (*labels, outcome)."""
+
+    def __init__(self, histogram, *labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = "error" if exc_type else "ok"
+        self.histogram.labels(*self.labels, outcome).observe(time.perf_counter() - self.started)
+        return False
+
+
+def record_pool_state(pool):
+    DB_POOL_SIZE.set(pool.size())
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def render_metrics():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    from prometheus_client import REGISTRY
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead():
+    """Drop this worker's live gauges (in-flight, pool) from the aggregate on shutdown."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+# -----------------------------
+# MIDDLEWARE
+# -----------------------------
+class MetricsMiddleware:
+    """Labels by route template (/orders/{order_id}), never the raw path, to keep cardinality bounded."""
+
+    def __init__(self, app, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = 500
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            route = scope.get("route")
+            template = route.path if route is not None else "unmatched"
+            HTTP_REQUESTS.labels(method, template, status).inc()
+            HTTP_LATENCY.labels(method, template, status).observe(elapsed)
@@ -0,0 +1,156 @@
+# app/core/profiling.py - Opt-in per-request SQL profiling (SQL_PROFILING=1)
+#
+# Cursor execute events on the engine feed a per-request QueryStats held in a
+# ContextVar; the middleware reports query count and DB time in response
+# headers and logs slow statements and N+1 candidates (the same statement
+# text run many times in one request, typically a lazy load in a loop).
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQL_PROFILING = os.getenv("SQL_PROFILING", "0") == "1"
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+SQL_SLOWEST_KEPT = 5
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest: List[tuple] = []  # (ms, statement), longest first
+        self.by_statement: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.by_statement[statement] = self.by_statement.get(statement, 0) + 1
+        if len(self.slowest) < SQL_SLOWEST_KEPT or elapsed_ms > self.slowest[-1][0]:
+            self.slowest.append((elapsed_ms, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[SQL_SLOWEST_KEPT:]
+
+    def n_plus_one(self) -> Dict[str, int]:
+        return {s: n for s, n in self.by_statement.items() if n >= SQL_N_PLUS_ONE_THRESHOLD}
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.total_ms, 2),
+            "slowest": [{"ms": round(ms, 2), "sql": sql} for ms, sql in self.slowest],
+            "n_plus_one": [{"count": n, "sql": sql} for sql, n in self.n_plus_one().items()],
+        }
+
+
+# Mutable object in the var: the greenlets SQLAlchemy's asyncio layer runs
+# queries in see the request's context, so records land on the same instance
+current_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("sql_query_stats", default=None)
+
+# assert_max_queries() collectors; process-wide so they also see queries run
+# on TestClient's portal thread
+_collectors: List[QueryStats] = []
+_collectors_lock = threading.Lock()
+_installed = set()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+    if _collectors:
+        with _collectors_lock:
+            for collector in _collectors:
+                collector.record(statement, elapsed_ms)
+    if elapsed_ms >= SQL_SLOW_QUERY_MS:
+        logger.warning("Slow query", extra={"ms": round(elapsed_ms, 2), "sql": " ".join(statement.split())[:500]})
+
+
+def install(engine):
+    """Attach the cursor listeners to an engine (AsyncEngine or Engine); idempotent."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if id(sync_engine) in _installed:
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _installed.add(id(sync_engine))
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine=None):
+    """Fail if the block runs more than `limit` statements:
+
+        with assert_max_queries(3):
+            client.get("/admin/orders", headers=auth)
+
+    Without `engine`, statements on the primary and every read replica count.
+    """
+    if engine is None:
+        from app.database import engine, replicas
+        for replica in replicas:
+            install(replica.engine)
+    install(engine)
+    stats = QueryStats()
+    with _collectors_lock:
+        _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        with _collectors_lock:
+            _collectors.remove(stats)
+    if stats.count > limit:
+        statements = "\n".join(f"  {n}x {sql}" for sql, n in stats.by_statement.items())
+        raise AssertionError(f"Expected at most {limit} queries, got {stats.count}:\n{statements}")
+
+
+# -----------------------------
+# MIDDLEWARE
+# -----------------------------
+class QueryProfilingMiddleware:
+    """Adds X-DB-Query-Count / X-DB-Time-Ms and logs one JSON line per request that touched the DB."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats()
+        token = current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.total_ms:.2f}".encode()))
+                if stats.n_plus_one():
+                    headers.append((b"x-db-n-plus-one", str(len(stats.n_plus_one())).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(token)
+            if stats.count:
+                route = scope.get("route")
+                record = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route.path if route is not None else None,
+                    **stats.summary(),
+                }
+                logger.info("Request queries", extra=record)
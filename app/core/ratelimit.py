@@ -0,0 +1,292 @@
+# app/core/ratelimit.py - Token-bucket rate limiting for public write endpoints
+#
+# Each (route, rule, client key) pair gets a bucket of `limit` tokens that
+# refills at limit/period per second; a request spends one token or gets 429.
+# Bucket state must be shared by every uvicorn worker, so the backends are:
+#   shared - fixed-size hash table in an mmap'd file, per-slot fcntl locks (default)
+#   redis  - one Lua script per check, for multi-host deployments (needs `redis`)
+#   memory - per-process dict (single worker / Windows dev)
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single worker, no cross-process lock needed
+    fcntl = None
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "shared" if fcntl else "memory")
+RATE_LIMIT_FILE = os.getenv("RATE_LIMIT_FILE", os.path.join(tempfile.gettempdir(), "ekb_ratelimit"))
+RATE_LIMIT_SLOTS = int(os.getenv("RATE_LIMIT_SLOTS", "16384"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+# Behind a proxy the client IP is the Nth entry from the right of X-Forwarded-For;
+# render.yaml sets 1. Leave 0 when nothing trusted sets the header (it is spoofable)
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+# "email" rules look for these JSON body fields
+EMAIL_FIELDS = ("customer_email", "email")
+MAX_INSPECTED_BODY = 64 * 1024
+
+
+class Rule(NamedTuple):
+    key: str      # "ip" or "email" (falls back to ip when the body has none)
+    limit: int    # bucket capacity
+    period: float  # seconds to refill a full bucket
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.period
+
+
+# (method, path) -> rules; every rule must pass
+DEFAULT_RATE_LIMITS: Dict[Tuple[str, str], List[Rule]] = {
+    ("POST", "/orders"): [Rule("ip", 20, 60), Rule("email", 10, 60)],
+    ("POST", "/api/payment/create"): [Rule("ip", 10, 60), Rule("email", 5, 60)],
+    ("POST", "/auth/google"): [Rule("ip", 20, 60)],
+}
+
+
+def parse_rate_limits(spec: str) -> Dict[Tuple[str, str], List[Rule]]:
+    """"POST /orders=ip:20/60,email:10/60;POST /auth/google=ip:20/60" -> rules."""
+    limits = {}
+    for entry in filter(None, (e.strip() for e in spec.split(";"))):
+        route, _, rules = entry.partition("=")
+        method, _, path = route.strip().partition(" ")
+        parsed = []
+        for rule in filter(None, (r.strip() for r in rules.split(","))):
+            key, _, amount = rule.partition(":")
+            limit, _, period = amount.partition("/")
+            parsed.append(Rule(key.strip(), int(limit), float(period or 60)))
+        limits[(method.upper(), path.strip())] = parsed
+    return limits
+
+
+RATE_LIMITS = parse_rate_limits(os.environ["RATE_LIMIT_RULES"]) if os.getenv("RATE_LIMIT_RULES") else DEFAULT_RATE_LIMITS
+
+
+def _refill(tokens: float, last: float, now: float, rule: Rule) -> float:
+    return min(float(rule.limit), tokens + (now - last) * rule.rate)
+
+
+# -----------------------------
+# BACKENDS
+# -----------------------------
+class MemoryBackend:
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def take(self, key: str, rule: Rule) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until one is available."""
+        now = time.time()
+        tokens, last = self._buckets.get(key, (float(rule.limit), now))
+        tokens = _refill(tokens, last, now, rule)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / rule.rate
+
+
+class SharedMemoryBackend:
+    """Buckets in an mmap'd file shared by all workers on the host.
+
+    Slot = (key hash, tokens, last refill, time the bucket is full again).
+    A key hashes to a window of PROBE adjacent slots, locked with one fcntl
+    byte-range lock. When the window is full the bucket that has been full
+    the longest is reused: it carries no state worth keeping.
+    """
+
+    SLOT = struct.Struct("<Qddd")
+    PROBE = 4
+
+    def __init__(self, path: str, slots: int):
+        self.slots = max(slots, self.PROBE)
+        size = self.slots * self.SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            # Every worker computes the same size; growing an existing file keeps its buckets
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def _window(self, key: str) -> Tuple[int, int]:
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        return digest, digest % (self.slots - self.PROBE + 1)
+
+    async def take(self, key: str, rule: Rule) -> float:
+        digest, first = self._window(key)
+        offset = first * self.SLOT.size
+        length = self.PROBE * self.SLOT.size
+        slot_struct, buf = self.SLOT, self._map
+        now = time.time()
+
+        if fcntl:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset)
+        try:
+            target, tokens, last = None, float(rule.limit), now
+            reuse, reuse_full_at = offset, None
+            for pos in range(offset, offset + length, slot_struct.size):
+                slot_hash, slot_tokens, slot_last, full_at = slot_struct.unpack_from(buf, pos)
+                if slot_hash == digest:
+                    target, tokens, last = pos, slot_tokens, slot_last
+                    break
+                if reuse_full_at is None or full_at < reuse_full_at:
+                    reuse, reuse_full_at = pos, full_at
+            if target is None:
+                target = reuse
+
+            tokens = _refill(tokens, last, now, rule)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            full_at = now + (rule.limit - tokens) / rule.rate
+            slot_struct.pack_into(buf, target, digest, tokens, now, full_at)
+        finally:
+            if fcntl:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+        return 0.0 if allowed else (1 - tokens) / rule.rate
+
+
+class RedisBackend:
+    # KEYS[1] bucket; ARGV: limit, rate, now. Returns retry-after in ms (0 = allowed)
+    SCRIPT = """
+    local limit, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+    local tokens = tonumber(state[1]) or limit
+    local last = tonumber(state[2]) or now
+    tokens = math.min(limit, tokens + (now - last) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = math.ceil((1 - tokens) / rate * 1000) end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'last', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(limit / rate * 1000))
+    return wait
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # optional dependency, only for RATE_LIMIT_BACKEND=redis
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, rule: Rule) -> float:
+        wait_ms = await self._script(keys=[f"ratelimit:{key}"], args=[rule.limit, rule.rate, time.time()])
+        return int(wait_ms) / 1000
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "redis":
+        return RedisBackend(RATE_LIMIT_REDIS_URL)
+    if name == "shared":
+        return SharedMemoryBackend(RATE_LIMIT_FILE, RATE_LIMIT_SLOTS)
+    if name == "memory":
+        return MemoryBackend()
+    raise RuntimeError(f"Unknown RATE_LIMIT_BACKEND '{name}'")
+
+
+# -----------------------------
+# MIDDLEWARE
+# -----------------------------
+def client_ip(scope) -> str:
+    if RATE_LIMIT_PROXY_HOPS:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                hops = [h.strip() for h in value.decode("latin-1").split(",")]
+                if len(hops) >= RATE_LIMIT_PROXY_HOPS:
+                    return hops[-RATE_LIMIT_PROXY_HOPS]
+                break
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """Pure ASGI so unlimited routes cost one dict lookup; limited ones one backend call per rule."""
+
+    def __init__(self, app, limits=None, backend=None):
+        self.app = app
+        self.limits = RATE_LIMITS if limits is None else limits
+        self.backend = backend
+        self.limited = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+        route = (scope["method"], scope["path"])
+        rules = self.limits.get(route)
+        if not rules:
+            return await self.app(scope, receive, send)
+        if self.backend is None:
+            self.backend = create_backend()
+
+        email = None
+        if any(rule.key == "email" for rule in rules):
+            email, receive = await self._read_email(receive)
+
+        ip = client_ip(scope)
+        for index, rule in enumerate(rules):
+            subject = email if rule.key == "email" and email else ip
+            try:
+                retry_after = await self.backend.take(f"{route[1]}|{index}|{subject}", rule)
+            except Exception as e:
+                # Fail open: a limiter outage must not take checkout down with it
+                logger.warning("Rate limit backend error, allowing request: %s", e)
+                break
+            if retry_after > 0:
+                self.limited += 1
+                return await self._reject(send, retry_after)
+        return await self.app(scope, receive, send)
+
+    async def _read_email(self, receive):
+        """Buffer the (small) JSON body to find the email, then replay it downstream."""
+        chunks, size, more = [], 0, True
+        while more:
+            message = await receive()
+            if message["type"] != "http.request":
+                return None, _replay([message], receive)
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more = message.get("more_body", False)
+            if size > MAX_INSPECTED_BODY:
+                break
+        body = b"".join(chunks)
+        replay = _replay([{"type": "http.request", "body": body, "more_body": more}], receive)
+        if more:
+            return None, replay
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return None, replay
+        if not isinstance(data, dict):
+            return None, replay
+        email = next((data[f] for f in EMAIL_FIELDS if isinstance(data.get(f), str)), None)
+        return (email.strip().lower() or None) if email else None, replay
+
+    async def _reject(self, send, retry_after: float):
+        body = orjson.dumps({"detail": "Too many requests"})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, int(retry_after + 0.999))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def _replay(messages: List[dict], receive):
+    pending = list(messages)
+
+    async def replay_receive():
+        if pending:
+            return pending.pop(0)
+        return await receive()
+    return replay_receive
@@ -1,13 +1,109 @@
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from jose import jwt
+
+from fastapi import Depends, Header, HTTPException
 from app.core.config import SECRET_KEY
 
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_HOURS = 2
+ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("ACCESS_TOKEN_EXPIRE_HOURS", "24"))
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
 
+# python-jose (and its cryptography backend) is imported on first use, not
+# during cold start: the public catalog endpoints never touch tokens
 def create_access_token(data: dict):
+    from jose import jwt
+
     to_encode = data.copy()
     to_encode.update({
         "exp": datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
     })
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+# -----------------------------
+# VERIFIED-TOKEN CACHE
+# -----------------------------
+class TokenCache:
+    """Bounded LRU of token -> claims; an entry is only served until the token's exp."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, claims: dict):
+        if self.max_size <= 0 or "exp" not in claims:
+            return
+        with self._lock:
+            self._entries[token] = (claims, float(claims["exp"]))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+
+def decode_access_token(token: str) -> dict:
+    """Verify one of our HS256 tokens; raises JWTError if it is invalid or expired."""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    from jose import jwt
+
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require_exp": True})
+    token_cache.put(token, claims)
+    return claims
+
+
+# -----------------------------
+# DEPENDENCIES
+# -----------------------------
+async def get_current_user(authorization: str = Header(None)) -> dict:
+    from jose import JWTError
+
+    if not authorization:
+        raise HTTPException(status_code=401, detail="No authorization header")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    try:
+        claims = decode_access_token(token.strip())
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return {"email": claims.get("email") or claims.get("sub"), "role": claims.get("role")}
+
+
+def require_role(*roles: str):
+    async def dependency(user: dict = Depends(get_current_user)) -> dict:
+        if user["role"] not in roles:
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+        return user
+    return dependency
@@ -1,11 +1,23 @@
 # app/database.py
+import asyncio
+import contextlib
+import contextvars
+import itertools
+import logging
 import os
+import time
+from typing import Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.engine.url import make_url
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import DB_POOL_CHECKOUT_WAIT, record_pool_state
+
+logger = logging.getLogger(__name__)
 
 # Load .env from project root (EKa_bhumi_backend/.env)
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -16,28 +28,392 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set (check .env and dotenv loading)")
 
-# Ensure URL uses psycopg v3 driver if it's Postgres
-if DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
 
-# Safe debug (doesn't print password)
-try:
-    u = make_url(DATABASE_URL)
-    print(f"Using DB: {u.drivername}://{u.host}:{u.port}/{u.database}")
-except Exception:
-    print("Using database URL (could not parse safely)")
+def _async_url(url: str) -> str:
+    """Ensure URL uses an async driver: psycopg v3 for Postgres, aiosqlite for SQLite."""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+DATABASE_URL = _async_url(DATABASE_URL)
+
+# SQLAlchemy names pool loggers after the pool class; keep dispose/recreate chatter out of INFO
+logging.getLogger(f"{__name__}.TimedQueuePool").setLevel(logging.WARNING)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports checkout wait and utilization to /metrics."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+            record_pool_state(self)
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            record_pool_state(self)
+
+
+# -----------------------------
+# ENGINE / POOL CONFIG
+# -----------------------------
+# Per worker: at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so the whole
+# service can open WEB_CONCURRENCY times that; keep it under the server's
+# max_connections (GET /admin/db/pool shows both).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))     # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))     # replace connections older than this
+# Liveness check on checkout only for connections idle longer than this;
+# 0 pings on every checkout (pool_pre_ping), -1 never pings
+DB_PING_IDLE_SECONDS = float(os.getenv("DB_PING_IDLE_SECONDS", "30"))
+# Postgres only: psycopg prepares a statement server-side after it has run
+# this many times on a connection ("off" for PgBouncer in transaction mode)
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "5")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # 0 disables
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+engine_options = {"pool_pre_ping": DB_PING_IDLE_SECONDS == 0}
+# In-memory SQLite needs its single shared connection (StaticPool); keep the default there
+if ":memory:" not in DATABASE_URL:
+    engine_options.update(
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        # Reuse the most recently returned connection: under light load the
+        # same few stay hot (no ping needed) and the rest idle out to recycle
+        pool_use_lifo=True,
+    )
+
+if DATABASE_URL.startswith("postgresql+psycopg://"):
+    connect_args = {
+        "prepare_threshold": None if DB_PREPARE_THRESHOLD.lower() in ("off", "none", "") else int(DB_PREPARE_THRESHOLD),
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    engine_options["connect_args"] = connect_args
+
+
+def _install_idle_ping(engine):
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(pool, "checkin")
+    def _stamp_idle_since(dbapi_connection, connection_record):
+        connection_record.info["idle_since"] = time.monotonic()
+
+    @event.listens_for(pool, "checkout")
+    def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        idle_since = connection_record.info.pop("idle_since", None)
+        if DB_PING_IDLE_SECONDS <= 0 or idle_since is None:
+            return  # fresh connection, or pinging is off / done by pool_pre_ping
+        if time.monotonic() - idle_since < DB_PING_IDLE_SECONDS:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            # The pool discards this connection and retries with a new one
+            raise exc.DisconnectionError(f"Idle connection failed liveness check: {e}")
+
+
+engine = create_async_engine(DATABASE_URL, **engine_options)
+_install_idle_ping(engine)
+
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-)
+def pool_stats() -> dict:
+    """This worker's pool; other workers have their own."""
+    pool = engine.sync_engine.pool
+    stats = {"pid": os.getpid(), "pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=DB_MAX_OVERFLOW,
+            timeout=DB_POOL_TIMEOUT,
+            recycle=DB_POOL_RECYCLE,
+        )
+    stats.update(
+        ping_idle_seconds=DB_PING_IDLE_SECONDS,
+        workers=WEB_CONCURRENCY,
+        max_connections_per_worker=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+        max_connections_total=(DB_POOL_SIZE + DB_MAX_OVERFLOW) * WEB_CONCURRENCY,
+    )
+    return stats
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# expire_on_commit=False: attributes stay loaded after commit, so handlers can
+# build responses without triggering implicit (blocking) refresh queries
+class WriteSession(Session):
+    """Primary sessions; their commits are what read-your-writes tracks."""
+
+
+SessionLocal = async_sessionmaker(engine, sync_session_class=WriteSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+
+# -----------------------------
+# READ REPLICAS
+# -----------------------------
+# Endpoints declare intent: Depends(get_write_db) always uses the primary;
+# Depends(get_read_db) uses a replica when one is healthy, lagging less than
+# DB_REPLICA_MAX_LAG_SECONDS, and already caught up with this client's last
+# write (read-your-writes). Otherwise it falls back to the primary.
+READ_REPLICA_URLS = [_async_url(u.strip()) for u in os.getenv("READ_REPLICA_URLS", "").split(",") if u.strip()]
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "2"))
+DB_REPLICA_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_CHECK_TIMEOUT", "1"))
+# How long a client's write keeps steering its reads (cookie / header lifetime)
+DB_READ_YOUR_WRITES_SECONDS = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "60"))
+WROTE_AT_COOKIE = "db_wrote_at"
+WROTE_AT_HEADER = "x-db-wrote-at"
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+REPLICA_LAG_SQL = {
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+        " ELSE coalesce(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_async_engine(url, **{**engine_options, **_replica_pool_options})
+        _install_idle_ping(self.engine)
+        self.sessionmaker = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        self.healthy = False  # until the first check passes
+        self.lag: Optional[float] = None
+        # Wall-clock time up to which the replica is known to have every write
+        self.caught_up_to = 0.0
+        self.checked_at = 0.0
+        self._check: Optional[asyncio.Task] = None
+
+    def stale(self) -> bool:
+        return time.monotonic() - self.checked_at >= DB_REPLICA_CHECK_INTERVAL
+
+    async def check(self):
+        started = time.time()
+        try:
+            sql = REPLICA_LAG_SQL.get(self.engine.dialect.name, "SELECT 0")
+            async with self.engine.connect() as conn:
+                lag = float(await asyncio.wait_for(conn.scalar(text(sql)), DB_REPLICA_CHECK_TIMEOUT))
+            if self.engine.dialect.name == "sqlite":
+                # Local stand-in: a copy of the primary file whose mtime is
+                # the snapshot time (see tests/test_read_replicas.py)
+                lag = max(0.0, started - os.path.getmtime(self.engine.url.database))
+        except Exception as e:
+            if self.healthy:
+                logger.warning("Read replica unavailable, reading from primary", extra={"replica": self.name, "error": str(e)})
+            self.healthy, self.lag = False, None
+        else:
+            if not self.healthy:
+                logger.info("Read replica available", extra={"replica": self.name, "lag_seconds": lag})
+            self.healthy, self.lag = True, lag
+            self.caught_up_to = started - lag
+        finally:
+            self.checked_at = time.monotonic()
+
+    def refresh(self):
+        """Start a background check when the last one is old; requests never wait on it."""
+        if self.stale() and (self._check is None or self._check.done()):
+            self._check = asyncio.get_running_loop().create_task(self.check())
+
+    def usable(self, wrote_at: Optional[float]) -> bool:
+        if not self.healthy or self.lag is None or self.lag > DB_REPLICA_MAX_LAG_SECONDS:
+            return False
+        return wrote_at is None or self.caught_up_to >= wrote_at
+
+    def stats(self) -> dict:
+        pool = self.engine.sync_engine.pool
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "checked_seconds_ago": round(time.monotonic() - self.checked_at, 1) if self.checked_at else None,
+            "pool": pool.status(),
+        }
+
+
+# Replica pools are plain queue pools: the /metrics pool gauges describe the primary
+_replica_pool_options = {"poolclass": AsyncAdaptedQueuePool} if "poolclass" in engine_options else {}
+replicas = [Replica(f"replica{i + 1}", url) for i, url in enumerate(READ_REPLICA_URLS)]
+_next_replica = itertools.count()
+
+
+class _RequestWrites:
+    """Per-request routing state: the client's last write time in, whether we wrote out."""
+
+    def __init__(self, wrote_at: Optional[float]):
+        self.wrote_at = wrote_at
+        self.wrote = False
+
+
+_request_writes: contextvars.ContextVar[Optional[_RequestWrites]] = contextvars.ContextVar("db_request_writes", default=None)
+
+
+def read_session(not_before: Optional[float] = None) -> AsyncSession:
+    """Session for reads only: a usable replica (round-robin), else the primary.
+
+    not_before: wall-clock time the data must be at least as fresh as.
+    """
+    state = _request_writes.get()
+    wrote_at = not_before
+    if state is not None and (state.wrote or state.wrote_at):
+        wrote_at = max(time.time() if state.wrote else state.wrote_at, not_before or 0)
+    for replica in replicas:
+        replica.refresh()
+    usable = [r for r in replicas if r.usable(wrote_at)]
+    if not usable:
+        return SessionLocal()
+    replica = usable[next(_next_replica) % len(usable)]
+    session = replica.sessionmaker()
+    session.info["replica"] = replica.name
+    return session
+
+
+async def get_or_primary(db: AsyncSession, model, ident):
+    """db.get(); a miss on a replica is retried on the primary (the row may not have replicated yet)."""
+    obj = await db.get(model, ident)
+    if obj is None and db.info.get("replica"):
+        async with SessionLocal() as primary:
+            obj = await primary.get(model, ident)
+    return obj
+
+
+@event.listens_for(WriteSession, "do_orm_execute")
+def _note_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(WriteSession, "after_flush")
+def _note_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(WriteSession, "after_commit")
+def _note_commit(session):
+    if session.info.pop("wrote", False):
+        state = _request_writes.get()
+        if state is not None:
+            state.wrote = True
+
+
+async def get_write_db():
+    async with SessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    async with read_session() as db:
         yield db
-    finally:
-        db.close()
+
+
+# Older name for the primary session dependency
+get_db = get_write_db
+
+
+def describe_engines() -> dict:
+    """Driver/host/database of the primary and replicas, without credentials (for the startup log)."""
+    def describe(url):
+        return f"{url.drivername}://{url.host or ''}{f':{url.port}' if url.port else ''}/{url.database}"
+    return {"primary": describe(engine.url), "replicas": [describe(r.engine.url) for r in replicas]}
+
+
+# Connections opened per engine at startup, in the background
+DB_POOL_WARM_CONNECTIONS = int(os.getenv("DB_POOL_WARM_CONNECTIONS", "2"))
+
+
+async def warm_pools():
+    """Open a few connections concurrently so the first requests don't pay connect + TLS + auth."""
+    for eng in [engine, *(r.engine for r in replicas)]:
+        if not isinstance(eng.sync_engine.pool, AsyncAdaptedQueuePool):
+            continue
+        # Held open together so they're distinct connections, then all returned to the pool
+        async with contextlib.AsyncExitStack() as stack:
+            results = await asyncio.gather(
+                *(stack.enter_async_context(eng.connect()) for _ in range(min(DB_POOL_WARM_CONNECTIONS, DB_POOL_SIZE))),
+                return_exceptions=True,
+            )
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.warning("Pool warm-up failed", extra={"database": eng.url.database, "error": str(failed[0])})
+
+
+def replica_stats() -> list:
+    return [r.stats() for r in replicas]
+
+
+async def dispose_engines():
+    await engine.dispose()
+    for replica in replicas:
+        await replica.engine.dispose()
+
+
+# -----------------------------
+# MIDDLEWARE
+# -----------------------------
+class ReadYourWritesMiddleware:
+    """Remembers when a client last wrote, so its next reads skip replicas that haven't caught up.
+
+    Sent back as a cookie and as an X-DB-Wrote-At header; cross-origin
+    clients without cookies can echo the header on later requests.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas:
+            return await self.app(scope, receive, send)
+
+        state = _RequestWrites(_client_wrote_at(scope["headers"]))
+        token = _request_writes.set(state)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state.wrote:
+                wrote_at = f"{time.time():.3f}"
+                cookie = f"{WROTE_AT_COOKIE}={wrote_at}; Max-Age={DB_READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode()),
+                    (WROTE_AT_HEADER.encode(), wrote_at.encode()),
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_writes.reset(token)
+
+
+def _client_wrote_at(headers) -> Optional[float]:
+    value = None
+    for name, raw in headers:
+        if name == WROTE_AT_HEADER.encode():
+            value = raw.decode("latin-1")
+        elif name == b"cookie" and value is None:
+            for part in raw.decode("latin-1").split(";"):
+                key, _, val = part.strip().partition("=")
+                if key == WROTE_AT_COOKIE:
+                    value = val
+    try:
+        wrote_at = float(value) if value else None
+    except ValueError:
+        return None
+    # Ignore stale or future-dated values
+    if wrote_at is None or not 0 <= time.time() - wrote_at <= DB_READ_YOUR_WRITES_SECONDS:
+        return None
+    return wrote_at
@@ -2,3 +2,8 @@ def send_order_confirmation_email(*args, **kwargs):
     # Temporary stub so the backend can run
     # Replace with real email sending later (SMTP/SendGrid/etc.)
     return True
+
+
+def send_order_status_email(*args, **kwargs):
+    # Temporary stub: shipped / delivered / cancelled notifications
+    return True
@@ -0,0 +1,2 @@
+from .queue import enqueue, enqueue_many, job
+from . import handlers  # noqa: F401  (registers job kinds)
@@ -0,0 +1,30 @@
+# app/jobs/handlers.py - Job kinds and what they do
+from starlette.concurrency import run_in_threadpool
+
+from app.email import send_order_confirmation_email, send_order_status_email
+from app.jobs.queue import job
+
+
+@job("order_confirmation_email")
+async def order_confirmation_email(**kwargs):
+    # Email senders are blocking (SMTP/HTTP SDKs); keep them off the event loop
+    ok = await run_in_threadpool(send_order_confirmation_email, **kwargs)
+    if ok is False:
+        raise RuntimeError(f"Email provider rejected confirmation for order {kwargs.get('order_id')}")
+
+
+@job("order_status_email")
+async def order_status_email(**kwargs):
+    ok = await run_in_threadpool(send_order_status_email, **kwargs)
+    if ok is False:
+        raise RuntimeError(f"Email provider rejected status update for order {kwargs.get('order_id')}")
+
+
+def order_confirmation_payload(order) -> dict:
+    return {
+        "to_email": order.customer_email,
+        "customer_name": order.customer_name,
+        "order_id": order.id,
+        "product_name": order.product_name,
+        "total_amount": order.total_amount,
+    }
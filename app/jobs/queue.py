@@ -0,0 +1,78 @@
+# app/jobs/queue.py - DB-backed outbox: enqueue side effects in the caller's transaction
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Job
+
+HANDLERS: Dict[str, Callable] = {}
+
+
+def job(kind: str):
+    """Register an async handler: @job("order_confirmation_email")."""
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def enqueue(db: AsyncSession, kind: str, **payload) -> Job:
+    """Add a job to the session; it is committed together with the caller's changes."""
+    new_job = Job(kind=kind, payload=json.dumps(payload, default=str), run_at=datetime.utcnow())
+    db.add(new_job)
+    return new_job
+
+
+def enqueue_many(db: AsyncSession, kind: str, payloads: Iterable[dict]) -> List[Job]:
+    now = datetime.utcnow()
+    jobs = [Job(kind=kind, payload=json.dumps(p, default=str), run_at=now) for p in payloads]
+    db.add_all(jobs)
+    return jobs
+
+
+async def claim_batch(db: AsyncSession, limit: int, lease_seconds: int) -> List[Job]:
+    """
+    Claim up to `limit` due jobs with one UPDATE ... WHERE id IN (due jobs)
+    RETURNING, committed before returning. On Postgres FOR UPDATE SKIP LOCKED
+    in the subquery keeps workers off each other's rows; SQLite runs the whole
+    statement under its write lock, so two workers never claim the same job.
+    """
+    now = datetime.utcnow()
+    lease_expired = now - timedelta(seconds=lease_seconds)
+    due = (
+        select(Job.id)
+        .where(or_(
+            and_(Job.status == "queued", Job.run_at <= now),
+            # Worker died mid-job: its lease ran out, so pick it up again
+            and_(Job.status == "running", Job.locked_at < lease_expired),
+        ))
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = (await db.execute(
+        update(Job)
+        .where(Job.id.in_(due.scalar_subquery()))
+        .values(status="running", locked_at=now, attempts=Job.attempts + 1, updated_at=now)
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    await db.commit()
+    return list(claimed)
+
+
+async def queue_stats(db: AsyncSession) -> dict:
+    counts = dict((await db.execute(
+        select(Job.status, func.count()).group_by(Job.status)
+    )).all())
+    oldest_due = (await db.execute(
+        select(func.min(Job.run_at)).where(Job.status == "queued", Job.run_at <= datetime.utcnow())
+    )).scalar()
+    return {
+        "depth": counts.get("queued", 0) + counts.get("running", 0),
+        "by_status": counts,
+        "oldest_due_seconds": (datetime.utcnow() - oldest_due).total_seconds() if oldest_due else 0.0,
+    }
@@ -1,18 +1,81 @@
 # app/main.py
+from app.core.logs import RequestIdMiddleware, setup_logging
+
+# Before anything else logs: JSON records, written off the event loop
+# (the queue is flushed at interpreter exit)
+setup_logging()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
+
+from app.database import ReadYourWritesMiddleware, describe_engines, dispose_engines, engine, replicas, warm_pools
+from app.core.ratelimit import RateLimitMiddleware
+from app.core.metrics import MetricsMiddleware, mark_worker_dead, render_metrics
+from app.core import profiling
+from app import migrations
+from app.payment.client import instamojo
+from app.jobs.worker import run_worker
+from app.orders.stock import run_stock_sweeper
+import asyncio
+import logging
+import os
 
-from app.database import Base, engine
+logger = logging.getLogger(__name__)
 
-# IMPORTANT: import models BEFORE create_all so tables are registered
-from app import models  # noqa: F401
+# orjson for every response; hot endpoints return ORJSONResponse/bytes directly
+# to also skip FastAPI's jsonable_encoder pass
+app = FastAPI(default_response_class=ORJSONResponse)
 
-app = FastAPI()
+# Each uvicorn worker drains the jobs outbox; claims never overlap (SKIP LOCKED)
+JOBS_WORKER_ENABLED = os.getenv("JOBS_WORKER_ENABLED", "1") == "1"
+# Returns stock from checkout holds whose payment never settled
+STOCK_SWEEPER_ENABLED = os.getenv("STOCK_SWEEPER_ENABLED", "1") == "1"
+worker_tasks = []
 
-# Create tables when the app starts (not at import time)
+# Apply pending schema migrations when the app starts (not at import time).
+# Kept short for cold starts on a plan that spins down: pools warm up in the
+# background, and the Instamojo client opens on the first payment call.
 @app.on_event("startup")
-def on_startup():
-    Base.metadata.create_all(bind=engine)
+async def on_startup():
+    logger.info("Database", extra=describe_engines())
+    worker_tasks.append(asyncio.create_task(warm_pools()))
+    await migrations.upgrade_if_needed()
+    if JOBS_WORKER_ENABLED:
+        worker_tasks.append(asyncio.create_task(run_worker()))
+    if STOCK_SWEEPER_ENABLED:
+        worker_tasks.append(asyncio.create_task(run_stock_sweeper()))
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in worker_tasks:
+        task.cancel()
+    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    await instamojo.close()
+    await dispose_engines()
+    mark_worker_dead()
+
+# Opt-in query count / DB time per request (X-DB-* headers, [SQL] log lines)
+if profiling.SQL_PROFILING:
+    profiling.install(engine)
+    for replica in replicas:
+        profiling.install(replica.engine)
+    app.add_middleware(profiling.QueryProfilingMiddleware)
+
+# With READ_REPLICA_URLS set: tracks each client's last write so its reads
+# avoid replicas that haven't caught up (cookie / X-DB-Wrote-At)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Token buckets for public write endpoints; added before CORS so 429s
+# still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
+# Outside the limiter so 429s are counted too
+app.add_middleware(MetricsMiddleware)
+
+# Outermost: every log line and response carries the X-Request-ID
+app.add_middleware(RequestIdMiddleware)
 
 # CORS Configuration
 origins = [
@@ -27,6 +90,8 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Clients echo it back so their reads see their own writes (app/database.py)
+    expose_headers=["X-DB-Wrote-At"],
 )
 
 # Import routers
@@ -43,6 +108,11 @@ app.include_router(admin_router, prefix="/admin")
 app.include_router(auth_router, prefix="/auth")
 app.include_router(payment_router, prefix="/api") 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/")
 async def root():
     return {"message": "EKB Backend API", "status": "running"}
\ No newline at end of file
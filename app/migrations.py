@@ -0,0 +1,238 @@
+# app/migrations.py - Versioned schema migrations (replaces create_all + drop-table resets)
+#
+# Each migration is (version, description, fn(connection)). Migrations must be
+# idempotent: migration 1 creates every table from the current models, so on a
+# fresh database the later steps find their columns/indexes already present.
+# The runner works on a sync Connection; from async code use
+# `await conn.run_sync(upgrade)`. Run pending migrations with:  python -m app.migrations
+import asyncio
+import logging
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+
+from app.database import Base, engine
+from app import models  # noqa: F401  (registers tables on Base.metadata)
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key so concurrent workers starting up apply migrations one at a time
+MIGRATION_LOCK_KEY = 7_510_001
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+
+# -----------------------------
+# HELPERS
+# -----------------------------
+def _create_table_if_missing(connection, table_name: str):
+    Base.metadata.tables[table_name].create(bind=connection, checkfirst=True)
+
+
+def _add_column_if_missing(connection, table_name: str, column_name: str):
+    existing = {c["name"] for c in inspect(connection).get_columns(table_name)}
+    if column_name in existing:
+        return
+    column = Base.metadata.tables[table_name].c[column_name]
+    column_type = column.type.compile(dialect=connection.dialect)
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+
+
+def _create_index_if_missing(connection, table_name: str, index_name: str):
+    table = Base.metadata.tables[table_name]
+    index = next(i for i in table.indexes if i.name == index_name)
+    index.create(bind=connection, checkfirst=True)
+
+
+# -----------------------------
+# MIGRATIONS
+# -----------------------------
+def _initial_schema(connection):
+    Base.metadata.create_all(bind=connection)
+
+
+def _hot_path_indexes(connection):
+    _create_index_if_missing(connection, "products", "ix_products_priority")
+    for index_name in (
+        "ix_orders_customer_email_id",
+        "ix_orders_status_id",
+        "ix_orders_payment_status_id",
+        "ix_orders_order_date",
+    ):
+        _create_index_if_missing(connection, "orders", index_name)
+
+
+# "[PAID] payment_id=..." (callback) / "[WEBHOOK] payment_id=..." (webhook)
+PAID_NOTE_RE = re.compile(r"\[(?:PAID|WEBHOOK)\] payment_id=(\S+)")
+
+
+def _payment_identifier_columns(connection):
+    _add_column_if_missing(connection, "orders", "payment_request_id")
+    _add_column_if_missing(connection, "orders", "payment_id")
+
+    # Backfill request ids that create_payment used to append to notes
+    rows = connection.execute(text(
+        "SELECT id, notes FROM orders "
+        "WHERE payment_request_id IS NULL AND notes LIKE '%[INSTAMOJO] request_id=%'"
+    )).fetchall()
+    seen = set()
+    for order_id, notes in rows:
+        request_id = notes.split("[INSTAMOJO] request_id=", 1)[1].split()[0]
+        if request_id in seen:
+            continue
+        seen.add(request_id)
+        connection.execute(
+            text("UPDATE orders SET payment_request_id = :rid WHERE id = :id"),
+            {"rid": request_id, "id": order_id},
+        )
+
+    # ...and the payment ids the callback/webhook appended, so a replayed
+    # delivery for an order paid before this migration is still a duplicate
+    seen = set(connection.execute(text(
+        "SELECT payment_id FROM orders WHERE payment_id IS NOT NULL"
+    )).scalars())
+    rows = connection.execute(text(
+        "SELECT id, notes FROM orders "
+        "WHERE payment_id IS NULL AND notes LIKE '%] payment_id=%'"
+    )).fetchall()
+    for order_id, notes in rows:
+        match = PAID_NOTE_RE.search(notes)
+        if not match or match.group(1) in seen:
+            continue
+        seen.add(match.group(1))
+        connection.execute(
+            text("UPDATE orders SET payment_id = :pid WHERE id = :id"),
+            {"pid": match.group(1), "id": order_id},
+        )
+
+    _create_index_if_missing(connection, "orders", "ux_orders_payment_request_id")
+    _create_index_if_missing(connection, "orders", "ux_orders_payment_id")
+    # The webhook used to match on (email, payment_status, order_date); now
+    # that it looks orders up by payment_request_id nothing reads that index
+    connection.execute(text("DROP INDEX IF EXISTS ix_orders_customer_email_payment_status_order_date"))
+
+
+def _jobs_table(connection):
+    _create_table_if_missing(connection, "jobs")
+
+
+def _product_search_index(connection):
+    # Postgres only; other databases use the in-process index in app/products/search.py
+    if connection.dialect.name != "postgresql":
+        return
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN "
+        "(to_tsvector('simple', coalesce(products.name, '') || ' ' || coalesce(products.description, '')))"
+    ))
+
+
+def _daily_sales_rollup(connection):
+    _create_table_if_missing(connection, "daily_sales")
+    if connection.execute(text("SELECT 1 FROM daily_sales LIMIT 1")).first():
+        return
+    # Backfill from existing orders; from here on app/orders/rollup.py keeps it current
+    connection.execute(text(
+        "INSERT INTO daily_sales "
+        "(day, product_id, status, payment_status, product_name, order_count, units, revenue) "
+        "SELECT date(order_date), product_id, coalesce(status, 'unknown'), "
+        "coalesce(payment_status, 'unknown'), max(product_name), count(*), "
+        "coalesce(sum(quantity), 0), coalesce(sum(total_amount), 0) "
+        "FROM orders WHERE order_date IS NOT NULL "
+        "GROUP BY date(order_date), product_id, coalesce(status, 'unknown'), coalesce(payment_status, 'unknown')"
+    ))
+
+
+def _stock_reservations_table(connection):
+    _create_table_if_missing(connection, "stock_reservations")
+
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "indexes for order lookups, admin filters and catalog sort", _hot_path_indexes),
+    (3, "unique payment_request_id / payment_id columns on orders (backfilled from notes)", _payment_identifier_columns),
+    (4, "jobs outbox table", _jobs_table),
+    (5, "full-text search index on products (Postgres)", _product_search_index),
+    (6, "daily_sales rollup table, backfilled from orders", _daily_sales_rollup),
+    (7, "stock_reservations table for checkout holds", _stock_reservations_table),
+]
+
+HEAD = MIGRATIONS[-1][0]
+
+
+# -----------------------------
+# RUNNER
+# -----------------------------
+def current_version(connection) -> int:
+    if not inspect(connection).has_table("schema_migrations"):
+        return 0
+    versions = connection.execute(select(schema_migrations.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def pending(connection):
+    version = current_version(connection)
+    return [m for m in MIGRATIONS if m[0] > version]
+
+
+def upgrade(connection) -> list:
+    """Apply pending migrations in order; returns the versions applied."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    migration_metadata.create_all(bind=connection)
+    applied = []
+    for version, description, fn in pending(connection):
+        fn(connection)
+        connection.execute(
+            schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            )
+        )
+        logger.info("Applied migration %s: %s", version, description)
+        applied.append(version)
+    return applied
+
+
+async def upgrade_if_needed() -> list:
+    """Startup path: one query when the stamp is already at HEAD (the usual case).
+
+    Only a missing or older stamp goes through upgrade(), with its advisory
+    lock, create_all and table inspection.
+    """
+    async with engine.connect() as conn:
+        try:
+            if await conn.scalar(select(func.max(schema_migrations.c.version))) == HEAD:
+                return []
+        except DBAPIError:
+            pass  # no schema_migrations table yet
+    async with engine.begin() as conn:
+        return await conn.run_sync(upgrade)
+
+
+def status(connection) -> dict:
+    version = current_version(connection)
+    return {
+        "current": version,
+        "head": HEAD,
+        "pending": [{"version": v, "description": d} for v, d, _ in MIGRATIONS if v > version],
+    }
+
+
+async def _main():
+    async with engine.begin() as conn:
+        applied = await conn.run_sync(upgrade)
+    await engine.dispose()
+    print(f"Schema at version {HEAD} (applied: {applied or 'none'})")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,5 +1,5 @@
 #models.py
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, VARCHAR, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, VARCHAR, DateTime, Date, Text, Index
 from sqlalchemy.sql import func
 from datetime import datetime
 from app.database import Base
@@ -29,6 +29,10 @@ class Product(Base):
     priority = Column(Integer, default=100)
     #created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_products_priority", "priority"),
+    )
+
 
 class Order(Base):
     __tablename__ = "orders"
@@ -52,7 +56,78 @@ class Order(Base):
     # Order status
     status = Column(String, default="pending")  # pending, confirmed, shipped, delivered, cancelled
     payment_status = Column(String, default="pending")  # pending, paid, failed
+
+    # Instamojo identifiers (unique; NULL until the gateway assigns them)
+    payment_request_id = Column(String, nullable=True)
+    payment_id = Column(String, nullable=True)
     
     # Timestamps
     order_date = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Customer order history (GET /orders?email=), newest first
+        Index("ix_orders_customer_email_id", "customer_email", "id"),
+        # Admin listing filters, keyset-paginated on id
+        Index("ix_orders_status_id", "status", "id"),
+        Index("ix_orders_payment_status_id", "payment_status", "id"),
+        Index("ix_orders_order_date", "order_date"),
+        # Webhook/callback lookup by gateway key; also dedupes repeated deliveries
+        Index("ux_orders_payment_request_id", "payment_request_id", unique=True),
+        Index("ux_orders_payment_id", "payment_id", unique=True),
+    )
+
+
+class Job(Base):
+    """Outbox row for side effects (emails etc.), processed by app/jobs/worker.py."""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String, nullable=False, default="queued")  # queued, running, done, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Claim query: due queued jobs and expired leases, oldest first
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+
+class DailySales(Base):
+    """Per-day order rollup, kept in step with orders by app/orders/rollup.py."""
+    __tablename__ = "daily_sales"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)
+    payment_status = Column(String, primary_key=True)
+    product_name = Column(String, nullable=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+
+class StockReservation(Base):
+    """Stock taken for an order; see app/orders/stock.py for the held/committed/released lifecycle."""
+    __tablename__ = "stock_reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, nullable=False)
+    product_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="held")  # held, committed, released, oversold
+    expires_at = Column(DateTime, nullable=True)  # only set while held
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ux_stock_reservations_order_id", "order_id", unique=True),
+        # Sweeper: lapsed holds, oldest first
+        Index("ix_stock_reservations_status_expires_at", "status", "expires_at"),
+    )
@@ -0,0 +1,92 @@
+# app/orders/rollup.py - Incremental maintenance of the daily_sales rollup
+#
+# Every place that creates an order, deletes one or changes its status calls
+# record_order_changes() in the same transaction, passing the order's rollup
+# snapshot before and after. The rollup then never needs a full rescan.
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import DailySales
+
+# (day, product_id, status, payment_status, product_name, units, revenue)
+Snapshot = Tuple
+
+
+def snapshot(order) -> Snapshot:
+    day = (order.order_date or datetime.utcnow()).date()
+    return (
+        day,
+        order.product_id,
+        order.status or "unknown",
+        order.payment_status or "unknown",
+        order.product_name,
+        int(order.quantity or 0),
+        float(order.total_amount or 0.0),
+    )
+
+
+def _aggregate(changes: Iterable[Tuple[Optional[Snapshot], Optional[Snapshot]]]):
+    deltas = defaultdict(lambda: [0, 0, 0.0, None])
+    for before, after in changes:
+        if before == after:
+            continue
+        for snap, sign in ((before, -1), (after, 1)):
+            if snap is None:
+                continue
+            day, product_id, status, payment_status, product_name, units, revenue = snap
+            delta = deltas[(day, product_id, status, payment_status)]
+            delta[0] += sign
+            delta[1] += sign * units
+            delta[2] += sign * revenue
+            delta[3] = product_name
+    return {key: d for key, d in deltas.items() if d[0] or d[1] or d[2]}
+
+
+async def record_order_changes(db: AsyncSession, changes: Iterable[Tuple[Optional[Snapshot], Optional[Snapshot]]]):
+    """changes: (before, after) pairs; None means the order didn't exist / no longer exists."""
+    deltas = _aggregate(changes)
+    if not deltas:
+        return
+
+    dialect = db.bind.dialect.name
+    for (day, product_id, status, payment_status), (count, units, revenue, product_name) in deltas.items():
+        values = dict(
+            day=day, product_id=product_id, status=status, payment_status=payment_status,
+            product_name=product_name, order_count=count, units=units, revenue=revenue,
+        )
+        if dialect in ("postgresql", "sqlite"):
+            insert = (postgresql if dialect == "postgresql" else sqlite).insert
+            stmt = insert(DailySales).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["day", "product_id", "status", "payment_status"],
+                set_={
+                    "order_count": DailySales.order_count + stmt.excluded.order_count,
+                    "units": DailySales.units + stmt.excluded.units,
+                    "revenue": DailySales.revenue + stmt.excluded.revenue,
+                    "product_name": stmt.excluded.product_name,
+                },
+            )
+            await db.execute(stmt)
+        else:
+            row = (await db.execute(
+                select(DailySales).where(
+                    DailySales.day == day, DailySales.product_id == product_id,
+                    DailySales.status == status, DailySales.payment_status == payment_status,
+                ).with_for_update()
+            )).scalars().first()
+            if row is None:
+                db.add(DailySales(**values))
+            else:
+                row.order_count += count
+                row.units += units
+                row.revenue += revenue
+                row.product_name = product_name
+
+
+async def record_order_change(db: AsyncSession, before: Optional[Snapshot], after: Optional[Snapshot]):
+    await record_order_changes(db, [(before, after)])
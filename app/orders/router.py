@@ -1,21 +1,27 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_or_primary, get_read_db, get_write_db
 from app.models import Order
 from app.schemas import OrderResponse, OrderCreate
+from app.orders.serializers import serialize_order
+from app.orders.rollup import record_order_change, snapshot
+from app.orders.stock import reserve_stock
+from fastapi.responses import ORJSONResponse
 from datetime import datetime
 from fastapi import Query
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # -----------------------------
 # PUBLIC ORDER ENDPOINTS ONLY
 # -----------------------------
 @router.post("/orders", response_model=OrderResponse)
-def create_order(order_data: OrderCreate, db: Session = Depends(get_db)):
+async def create_order(order_data: OrderCreate, db: AsyncSession = Depends(get_write_db)):
     try:
-        print("🔵 [Backend] Received order data:", order_data.dict())
-
         order = Order(
             product_id=order_data.product_id,
             product_name=order_data.product_name,
@@ -34,33 +40,42 @@ def create_order(order_data: OrderCreate, db: Session = Depends(get_db)):
         )
 
         db.add(order)
-        db.commit()
-        db.refresh(order)
+        await db.flush()
+        await record_order_change(db, None, snapshot(order))
+        await reserve_stock(db, order)
+        await db.commit()
+        await db.refresh(order)
 
-        print(f"✅ [Backend] Order created successfully: Order ID {order.id}")
-        return order
+        logger.info("Order created", extra={"order_id": order.id, "product_id": order.product_id, "quantity": order.quantity})
+        return ORJSONResponse(serialize_order(order))
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
-        print(f"❌ [Backend] Error creating order: {repr(e)}")
+        await db.rollback()
+        logger.exception("Error creating order")
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
 
 
 @router.get("/orders/{order_id}", response_model=OrderResponse)
-def get_order(order_id: int, db: Session = Depends(get_db)):
+async def get_order(order_id: int, db: AsyncSession = Depends(get_read_db)):
     try:
-        order = db.query(Order).filter(Order.id == order_id).first()
+        # Usually fetched right after POST /orders: a miss is retried on the primary
+        order = await get_or_primary(db, Order, order_id)
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
-        return order
+        return ORJSONResponse(serialize_order(order))
 
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"❌ [Backend] Error fetching order {order_id}: {repr(e)}")
+    except Exception:
+        logger.exception("Error fetching order %s", order_id)
         raise HTTPException(status_code=500, detail="Failed to fetch order")
 
 @router.get("/orders")
-def list_orders(email: str = Query(...), db: Session = Depends(get_db)):
-    orders = db.query(Order).filter(Order.customer_email == email).order_by(Order.id.desc()).all()
-    return orders
\ No newline at end of file
+async def list_orders(email: str = Query(...), db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(
+        select(Order).where(Order.customer_email == email).order_by(Order.id.desc())
+    )
+    return ORJSONResponse([serialize_order(o) for o in result.scalars()])
\ No newline at end of file
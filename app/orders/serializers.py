@@ -0,0 +1,23 @@
+# app/orders/serializers.py - Order -> JSON-ready dict, shared by public and admin endpoints
+
+
+def serialize_order(o):
+    return {
+        "id": o.id,
+        "product_id": o.product_id,
+        "product_name": o.product_name,
+        "quantity": o.quantity,
+        "unit_price": float(o.unit_price),
+        "total_amount": float(o.total_amount),
+        "customer_name": o.customer_name,
+        "customer_email": o.customer_email,
+        "customer_phone": o.customer_phone,
+        "shipping_address": o.shipping_address,
+        "notes": o.notes,
+        "status": o.status,
+        "payment_status": o.payment_status,
+        "payment_request_id": o.payment_request_id,
+        "payment_id": o.payment_id,
+        "order_date": o.order_date.isoformat() if o.order_date else None,
+        "updated_at": o.updated_at.isoformat() if o.updated_at else None,
+    }
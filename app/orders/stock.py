@@ -0,0 +1,224 @@
+# app/orders/stock.py - Stock reservation for checkout
+#
+# Stock is taken with one conditional UPDATE (quantity >= n) so concurrent
+# checkouts of the same SKU never read-modify-write: the row lock is held
+# only for that statement until commit, and a losing checkout simply gets
+# no row back. Every order gets a stock_reservations row:
+#   held      - pending online payment, returned to stock after the TTL
+#   committed - stock is sold (paid, or a direct order)
+#   released  - stock went back (payment failed, hold expired, cancelled)
+# Status changes are conditional too, so a hold is released at most once.
+#
+# Lock order: orders -> daily_sales -> stock_reservations -> products. Every
+# writer locks (or inserts) the order row first, then calls
+# record_order_change(), then these; commit_hold/release_stock take the
+# reservation row before the product row.
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import BACKGROUND_TASK_LATENCY, timed
+from app.database import SessionLocal, WriteSession
+from app.models import Order, Product, StockReservation
+from app.orders.rollup import record_order_changes, snapshot
+from app.products.cache import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+STOCK_HOLD_TTL_SECONDS = int(os.getenv("STOCK_HOLD_TTL_SECONDS", "900"))
+STOCK_SWEEP_INTERVAL = float(os.getenv("STOCK_SWEEP_INTERVAL", "30"))
+STOCK_SWEEP_BATCH_SIZE = int(os.getenv("STOCK_SWEEP_BATCH_SIZE", "200"))
+
+
+# Cached catalog quantities follow the stock counter; it is bumped once the
+# change is committed, so no worker can re-read the old quantity under it
+@event.listens_for(WriteSession, "after_commit")
+def _bump_stock_version(session):
+    if session.info.pop("stock_changed", False):
+        catalog_cache.bump_stock()
+
+
+@event.listens_for(WriteSession, "after_rollback")
+def _forget_stock_change(session):
+    session.info.pop("stock_changed", None)
+
+
+async def take_stock(db: AsyncSession, product_id: int, quantity: int) -> bool:
+    result = await db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.quantity >= quantity)
+        .values(quantity=Product.quantity - quantity)
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    )
+    taken = result.first() is not None
+    if taken:
+        db.info["stock_changed"] = True
+    return taken
+
+
+async def _return_stock(db: AsyncSession, product_id: int, quantity: int):
+    await db.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(quantity=Product.quantity + quantity)
+        .execution_options(synchronize_session=False)
+    )
+    db.info["stock_changed"] = True
+
+
+async def reserve_stock(db: AsyncSession, order: Order, hold: bool = False):
+    """Take stock for a flushed order; hold=True expires after STOCK_HOLD_TTL_SECONDS unless paid."""
+    if order.quantity is None or order.quantity < 1:
+        raise HTTPException(status_code=400, detail="Quantity must be at least 1")
+    if not await take_stock(db, order.product_id, order.quantity):
+        exists = (await db.execute(select(Product.id).where(Product.id == order.product_id))).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="Product not found")
+        raise HTTPException(status_code=409, detail="Insufficient stock")
+
+    now = datetime.utcnow()
+    db.add(StockReservation(
+        order_id=order.id,
+        product_id=order.product_id,
+        quantity=order.quantity,
+        status="held" if hold else "committed",
+        expires_at=now + timedelta(seconds=STOCK_HOLD_TTL_SECONDS) if hold else None,
+        created_at=now,
+        updated_at=now,
+    ))
+
+
+async def commit_hold(db: AsyncSession, order: Order):
+    """Payment succeeded: keep the held stock. If the hold already lapsed, try to take it again."""
+    result = await db.execute(
+        update(StockReservation)
+        .where(StockReservation.order_id == order.id, StockReservation.status == "held")
+        .values(status="committed", expires_at=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        return
+    reservation = (await db.execute(
+        select(StockReservation.status).where(StockReservation.order_id == order.id)
+    )).scalar()
+    if reservation == "committed":
+        return
+    # Paid after the sweeper returned the stock; the payment stands either way
+    if await take_stock(db, order.product_id, order.quantity):
+        status = "committed"
+    else:
+        status = "oversold"
+        logger.error("Order %s paid after its hold expired and product %s is out of stock", order.id, order.product_id)
+    values = dict(status=status, expires_at=None, updated_at=datetime.utcnow())
+    if reservation is None:
+        db.add(StockReservation(order_id=order.id, product_id=order.product_id, quantity=order.quantity, **values))
+    else:
+        await db.execute(
+            update(StockReservation)
+            .where(StockReservation.order_id == order.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def release_stock(db: AsyncSession, order_ids: Iterable[int], statuses=("held",)) -> int:
+    """Return stock for the given orders' reservations that are still in one of `statuses`."""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+    released = (await db.execute(
+        update(StockReservation)
+        .where(StockReservation.order_id.in_(order_ids), StockReservation.status.in_(statuses))
+        .values(status="released", expires_at=None, updated_at=datetime.utcnow())
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    per_product = {}
+    for product_id, quantity in released:
+        per_product[product_id] = per_product.get(product_id, 0) + quantity
+    # Fixed order so two releases touching the same products can't deadlock
+    for product_id in sorted(per_product):
+        await _return_stock(db, product_id, per_product[product_id])
+    return len(released)
+
+
+# -----------------------------
+# EXPIRED HOLD SWEEPER
+# -----------------------------
+async def sweep_expired_holds() -> int:
+    """Release one batch of lapsed holds and cancel their still-unpaid orders."""
+    async with SessionLocal() as db:
+        expired = (await db.execute(
+            select(StockReservation.order_id)
+            .where(StockReservation.status == "held", StockReservation.expires_at <= datetime.utcnow())
+            .order_by(StockReservation.expires_at)
+            .limit(STOCK_SWEEP_BATCH_SIZE)
+        )).scalars().all()
+        if not expired:
+            return 0
+
+        # Order rows first, like every other writer. One a payment is settling
+        # right now is skipped; the next sweep sees how it ended
+        orders = (await db.execute(
+            select(Order)
+            .where(Order.id.in_(expired))
+            .with_for_update(skip_locked=True)
+            .execution_options(populate_existing=True)
+        )).scalars().all()
+        locked = {order.id for order in orders}
+        busy = set((await db.execute(
+            select(Order.id).where(Order.id.in_([order_id for order_id in expired if order_id not in locked]))
+        )).scalars())
+
+        # Paid, or confirmed by an admin, with the hold never committed: the
+        # stock is sold. Only orders still pending/pending are cancelled
+        sold = [o for o in orders if o.payment_status == "paid" or o.status not in ("pending", "cancelled")]
+        unpaid = {o.id: o for o in orders if o.status == "pending" and o.payment_status == "pending"}
+        cancelled = []
+        if unpaid:
+            # Conditional too: SQLite ignores FOR UPDATE, and a payment that
+            # settled since the read above must not be overwritten
+            cancelled = (await db.execute(
+                update(Order)
+                .where(Order.id.in_(list(unpaid)), Order.status == "pending", Order.payment_status == "pending")
+                .values(status="cancelled", payment_status="failed", updated_at=datetime.utcnow())
+                .returning(Order.id, Order.order_date, Order.product_id, Order.product_name, Order.status,
+                           Order.payment_status, Order.quantity, Order.total_amount)
+                .execution_options(synchronize_session=False)
+            )).all()
+            await record_order_changes(db, [(snapshot(unpaid[row.id]), snapshot(row)) for row in cancelled])
+        for order in sorted(sold, key=lambda o: o.product_id):
+            await commit_hold(db, order)
+
+        # Stock goes back for the orders cancelled above, plus holds whose
+        # order had already failed or been cancelled, or no longer exists
+        settled = {o.id for o in sold} | set(unpaid)
+        released = await release_stock(db, [row.id for row in cancelled] + [
+            order_id for order_id in expired if order_id not in settled and order_id not in busy
+        ])
+        await db.commit()
+        if released:
+            logger.info("Released %s expired stock hold(s)", released)
+        return len(expired) - len(busy)
+
+
+async def run_stock_sweeper():
+    while True:
+        try:
+            with timed(BACKGROUND_TASK_LATENCY, "stock_sweeper"):
+                swept = await sweep_expired_holds()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Stock sweeper error")
+            swept = 0
+        if swept < STOCK_SWEEP_BATCH_SIZE:
+            await asyncio.sleep(STOCK_SWEEP_INTERVAL)
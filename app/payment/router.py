@@ -1,19 +1,28 @@
 # app/payment/router.py
+import logging
 import hmac
 import hashlib
-import requests
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from app.database import get_db
+from typing import Callable
+from app.database import get_write_db
 from app.models import Order
+from app.payment.client import instamojo
+from app.jobs import enqueue
+from app.jobs.handlers import order_confirmation_payload
+from app.orders.rollup import record_order_change, snapshot
+from app.orders.stock import commit_hold, release_stock, reserve_stock
 import os
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-BASE_URL     = os.getenv("INSTAMOJO_BASE_URL", "https://www.instamojo.com/api/1.1/")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 BACKEND_URL  = os.getenv("BACKEND_URL",  "http://localhost:8000")
 
@@ -31,23 +40,88 @@ class PaymentInitRequest(BaseModel):
     notes:            str = ""
 
 
+async def get_order_by_payment_request(db: AsyncSession, payment_request_id: str):
+    result = await db.execute(select(Order).where(Order.payment_request_id == payment_request_id))
+    return result.scalars().first()
+
+
+async def settle_order(db: AsyncSession, order_id: int, applies: Callable[[Order], bool], **values):
+    """
+    Lock the order, re-check it and apply `values`; returns (order, before
+    snapshot), or (None, None) when `applies` says another delivery already
+    settled it. The order row is the first lock every payment write takes.
+    """
+    while True:
+        order = (await db.execute(
+            select(Order)
+            .where(Order.id == order_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )).scalars().first()
+        if order is None or not applies(order):
+            return None, None
+        before = snapshot(order)
+        # Guarded on the state just read: SQLite ignores FOR UPDATE, so when a
+        # concurrent delivery got in first nothing matches and we re-read
+        result = await db.execute(
+            update(Order)
+            .where(Order.id == order.id, Order.status == order.status, Order.payment_status == order.payment_status)
+            .values(updated_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            await db.refresh(order)
+            return order, before
+
+
+async def mark_order_paid(db: AsyncSession, order_id: int, payment_id: str) -> bool:
+    """Returns False for a duplicate delivery (the order is already paid)."""
+    order, before = await settle_order(
+        db, order_id, lambda o: o.payment_status != "paid",
+        payment_status="paid", status="confirmed", payment_id=payment_id,
+    )
+    if order is None:
+        return False
+    await record_order_change(db, before, snapshot(order))
+    await commit_hold(db, order)
+    enqueue(db, "order_confirmation_email", **order_confirmation_payload(order))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # ux_orders_payment_id: this payment is already recorded on another order
+        await db.rollback()
+        logger.error("Payment id already used by another order", extra={"order_id": order_id, "payment_id": payment_id})
+        return False
+    return True
+
+
+async def mark_order_failed(db: AsyncSession, order_id: int) -> bool:
+    """Cancel a still-pending order and return its held stock; False if it was already settled."""
+    order, before = await settle_order(
+        db, order_id, lambda o: o.payment_status == "pending",
+        payment_status="failed", status="cancelled",
+    )
+    if order is None:
+        return False
+    await record_order_change(db, before, snapshot(order))
+    await release_stock(db, [order.id])
+    await db.commit()
+    return True
+
+
 # ─────────────────────────────────────────────────────
 # 1. CREATE PAYMENT
 # ─────────────────────────────────────────────────────
 @router.post("/payment/create")
-def create_payment(data: PaymentInitRequest, db: Session = Depends(get_db)):
+async def create_payment(data: PaymentInitRequest, db: AsyncSession = Depends(get_write_db)):
     api_key    = os.getenv("INSTAMOJO_API_KEY")
     auth_token = os.getenv("INSTAMOJO_AUTH_TOKEN")
 
     if not api_key or not auth_token:
         raise HTTPException(status_code=500, detail="Instamojo credentials not configured")
 
-    headers = {
-        "X-Api-Key":    api_key,
-        "X-Auth-Token": auth_token,
-    }
-
-    # Save pending order first to get an order ID
+    # Save pending order first to get an order ID; its stock is held until
+    # the payment settles or STOCK_HOLD_TTL_SECONDS passes
     order = Order(
         product_id       = data.product_id,
         product_name     = data.product_name,
@@ -65,8 +139,15 @@ def create_payment(data: PaymentInitRequest, db: Session = Depends(get_db)):
         updated_at       = datetime.utcnow(),
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.flush()
+    await record_order_change(db, None, snapshot(order))
+    try:
+        await reserve_stock(db, order, hold=True)
+    except HTTPException:
+        await db.rollback()
+        raise
+    await db.commit()
+    await db.refresh(order)
 
     # Clean phone — Instamojo needs exactly 10 digits
     clean_phone = data.customer_phone.replace("+91", "").replace(" ", "").strip()
@@ -87,33 +168,32 @@ def create_payment(data: PaymentInitRequest, db: Session = Depends(get_db)):
         "allow_repeated_payments": "True",
     }
 
-    print(f"[PAYMENT] Creating order={order.id} amount={payload['amount']} phone={clean_phone}")
+    logger.info("Creating payment request", extra={"order_id": order.id, "amount": payload["amount"]})
 
     try:
-        response = requests.post(
-            f"{BASE_URL}payment-requests/",
-            data=payload,
-            headers=headers
-        )
-        res_data = response.json()
+        res_data = await instamojo.create_payment_request(payload)
     except Exception as e:
-        db.delete(order)
-        db.commit()
+        await db.delete(order)
+        await record_order_change(db, snapshot(order), None)
+        await release_stock(db, [order.id])
+        await db.commit()
         raise HTTPException(status_code=500, detail=f"Instamojo connection error: {str(e)}")
 
     if not res_data.get("success"):
-        print(f"[PAYMENT] Instamojo rejected: {res_data}")
-        db.delete(order)
-        db.commit()
+        logger.warning("Instamojo rejected payment request", extra={"order_id": order.id, "response": res_data})
+        await db.delete(order)
+        await record_order_change(db, snapshot(order), None)
+        await release_stock(db, [order.id])
+        await db.commit()
         raise HTTPException(status_code=400, detail=res_data)
 
     payment_request_id = res_data["payment_request"]["id"]
     payment_url        = res_data["payment_request"]["longurl"]
 
-    order.notes = f"{order.notes}\n[INSTAMOJO] request_id={payment_request_id}".strip()
-    db.commit()
+    order.payment_request_id = payment_request_id
+    await db.commit()
 
-    print(f"[PAYMENT] ✅ Created payment_request_id={payment_request_id}")
+    logger.info("Payment request created", extra={"order_id": order.id, "payment_request_id": payment_request_id})
 
     return {
         "success":            True,
@@ -127,51 +207,39 @@ def create_payment(data: PaymentInitRequest, db: Session = Depends(get_db)):
 # 2. CALLBACK — Instamojo redirects user here after payment
 # ─────────────────────────────────────────────────────
 @router.get("/payment/callback")
-def payment_callback(
+async def payment_callback(
     payment_id:         str,
     payment_request_id: str,
     order_id:           int,
-    db:                 Session = Depends(get_db)
+    db:                 AsyncSession = Depends(get_write_db)
 ):
-    api_key    = os.getenv("INSTAMOJO_API_KEY")
-    auth_token = os.getenv("INSTAMOJO_AUTH_TOKEN")
-    headers    = {"X-Api-Key": api_key, "X-Auth-Token": auth_token}
-
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        print(f"[CALLBACK] Order {order_id} not found")
+    order = await get_order_by_payment_request(db, payment_request_id)
+    if not order or order.id != order_id:
+        logger.warning("Callback for unknown order", extra={"order_id": order_id, "payment_request_id": payment_request_id})
         return RedirectResponse(url=f"{FRONTEND_URL}/?payment=failed&reason=order_not_found")
 
+    # Page reload / webhook got here first: nothing left to verify
+    if order.payment_status == "paid":
+        return RedirectResponse(url=f"{FRONTEND_URL}/account?payment=success")
+
     try:
-        response = requests.get(
-            f"{BASE_URL}payment-requests/{payment_request_id}/{payment_id}/",
-            headers=headers
-        )
-        res_data = response.json()
-        print(f"[CALLBACK] Instamojo response: {res_data}")
-    except Exception as e:
-        print(f"[CALLBACK] Error verifying: {e}")
+        res_data = await instamojo.get_payment(payment_request_id, payment_id)
+        logger.debug("Instamojo payment lookup", extra={"order_id": order_id, "response": res_data})
+    except Exception:
+        logger.exception("Error verifying payment %s", payment_id)
         return RedirectResponse(url=f"{FRONTEND_URL}/?payment=failed&reason=verification_error")
 
     payment = res_data.get("payment_request", {}).get("payment", {})
     status  = payment.get("status", "")
 
-    print(f"[CALLBACK] payment_id={payment_id} status={status}")
 
     if status == "Credit":
-        order.payment_status = "paid"
-        order.status         = "confirmed"
-        order.notes          = f"{order.notes}\n[PAID] payment_id={payment_id}".strip()
-        order.updated_at     = datetime.utcnow()
-        db.commit()
-        print(f"[CALLBACK] ✅ Order {order_id} confirmed")
+        if await mark_order_paid(db, order.id, payment_id):
+            logger.info("Payment confirmed", extra={"order_id": order_id, "payment_id": payment_id, "source": "callback"})
         return RedirectResponse(url=f"{FRONTEND_URL}/account?payment=success")
     else:
-        order.payment_status = "failed"
-        order.status         = "cancelled"
-        order.updated_at     = datetime.utcnow()
-        db.commit()
-        print(f"[CALLBACK] ❌ Order {order_id} failed status={status}")
+        await mark_order_failed(db, order.id)
+        logger.info("Payment failed", extra={"order_id": order_id, "payment_id": payment_id, "status": status, "source": "callback"})
         return RedirectResponse(url=f"{FRONTEND_URL}/?payment=failed")
 
 
@@ -179,7 +247,7 @@ def payment_callback(
 # 3. WEBHOOK — Instamojo POSTs here in background
 # ─────────────────────────────────────────────────────
 @router.post("/payment/webhook")
-async def payment_webhook(request: Request, db: Session = Depends(get_db)):
+async def payment_webhook(request: Request, db: AsyncSession = Depends(get_write_db)):
     form_data  = await request.form()
     data       = dict(form_data)
     auth_token = os.getenv("INSTAMOJO_AUTH_TOKEN")
@@ -196,29 +264,29 @@ async def payment_webhook(request: Request, db: Session = Depends(get_db)):
         if mac_provided != mac_calculated:
             raise HTTPException(status_code=403, detail="Invalid MAC signature")
 
-    payment_status = data.get("status")
-    payment_id     = data.get("payment_id")
-    buyer_email    = data.get("buyer")
-    amount         = data.get("amount")
-
-    print(f"[WEBHOOK] status={payment_status} payment_id={payment_id} email={buyer_email} amount=₹{amount}")
-
-    if payment_status == "Credit" and buyer_email:
-        order = (
-            db.query(Order)
-            .filter(
-                Order.customer_email == buyer_email,
-                Order.payment_status == "pending"
-            )
-            .order_by(Order.order_date.desc())
-            .first()
-        )
-        if order:
-            order.payment_status = "paid"
-            order.status         = "confirmed"
-            order.notes          = f"{order.notes}\n[WEBHOOK] payment_id={payment_id}".strip()
-            order.updated_at     = datetime.utcnow()
-            db.commit()
-            print(f"[WEBHOOK] ✅ Order {order.id} marked as paid")
+    payment_status     = data.get("status")
+    payment_id         = data.get("payment_id")
+    payment_request_id = data.get("payment_request_id")
+    amount             = data.get("amount")
+
+    logger.info("Payment webhook", extra={"status": payment_status, "payment_id": payment_id, "payment_request_id": payment_request_id, "amount": amount})
+
+    if payment_status == "Credit" and payment_request_id:
+        order = await get_order_by_payment_request(db, payment_request_id)
+        if not order:
+            logger.warning("Webhook for unknown payment request", extra={"payment_request_id": payment_request_id})
+        elif order.payment_status == "paid":
+            if order.payment_id == payment_id:
+                logger.info("Duplicate webhook delivery ignored", extra={"order_id": order.id})
+            else:
+                logger.warning("Webhook payment for an order already paid", extra={"order_id": order.id, "payment_id": payment_id, "paid_with": order.payment_id})
+        elif await mark_order_paid(db, order.id, payment_id):
+            logger.info("Payment confirmed", extra={"order_id": order.id, "payment_id": payment_id, "source": "webhook"})
+        else:
+            logger.info("Duplicate webhook delivery ignored", extra={"order_id": order.id})
+    elif payment_status == "Failed" and payment_request_id:
+        order = await get_order_by_payment_request(db, payment_request_id)
+        if order and await mark_order_failed(db, order.id):
+            logger.info("Payment failed", extra={"order_id": order.id, "payment_id": payment_id, "source": "webhook"})
 
     return {"status": "ok"}
\ No newline at end of file
@@ -0,0 +1,235 @@
+# app/products/cache.py - In-process catalog cache with a cross-worker version counter
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+import orjson
+from sqlalchemy import select
+
+from app.database import read_session
+from app.models import Product
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single worker, no cross-process lock needed
+    fcntl = None
+
+# The version counter lives in a small file so every uvicorn worker on the
+# same host sees admin writes made by any other worker. Stock has a counter
+# of its own next to it, bumped after every commit that moved a quantity:
+# a checkout re-reads only id/quantity (refresh_stock) instead of dropping
+# the whole catalog, and a page view with no stock change touches no DB.
+CATALOG_VERSION_FILE = os.getenv(
+    "CATALOG_VERSION_FILE",
+    os.path.join(tempfile.gettempdir(), "ekb_catalog_version"),
+)
+
+
+def _read_counter(path: str) -> int:
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _counter_mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def _bump_counter(path: str) -> int:
+    with open(f"{path}.lock", "w") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        version = _read_counter(path) + 1
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+        return version
+
+
+def serialize_product(product) -> Dict[str, Any]:
+    return {
+        "id": product.id,
+        "name": product.name,
+        "price": float(product.price) if product.price else 0.0,
+        "description": product.description or "",
+        "quantity": int(product.quantity or 0),
+        "image_url": product.image_url or "",
+        "image2_url": product.image2_url or "",
+        "priority": product.priority or 100,
+    }
+
+
+def with_stock(items: list, stock: Dict[int, int]) -> list:
+    """Copy of `items` with quantities from `stock` (id -> live quantity); unchanged items are reused."""
+    return [
+        item if stock.get(item["id"], item["quantity"]) == item["quantity"]
+        else dict(item, quantity=stock[item["id"]])
+        for item in items
+    ]
+
+
+class CatalogCache:
+    def __init__(self, version_file: str):
+        self.version_file = version_file
+        self.stock_version_file = f"{version_file}.stock"
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._stock_version: Optional[int] = None
+        self._list: Optional[list] = None
+        self._list_bytes: Optional[bytes] = None
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # -----------------------------
+    # VERSION COUNTERS
+    # -----------------------------
+    def current_version(self) -> int:
+        return _read_counter(self.version_file)
+
+    def bumped_at(self) -> float:
+        """Wall-clock time of the last bump (0 if never)."""
+        return _counter_mtime(self.version_file)
+
+    def bump(self) -> int:
+        """Call after every committed catalog write."""
+        with self._lock:
+            version = _bump_counter(self.version_file)
+            self._drop(version)
+            return version
+
+    def current_stock_version(self) -> int:
+        return _read_counter(self.stock_version_file)
+
+    def stock_bumped_at(self) -> float:
+        return _counter_mtime(self.stock_version_file)
+
+    def bump_stock(self) -> int:
+        """Call after every commit that changed a product quantity (app/orders/stock.py does)."""
+        return _bump_counter(self.stock_version_file)
+
+    def _drop(self, version: int):
+        self._version = version
+        self._stock_version = None
+        self._list = None
+        self._list_bytes = None
+        self._items = {}
+
+    def _sync(self) -> int:
+        version = self.current_version()
+        if version != self._version:
+            self._drop(version)
+        return version
+
+    # -----------------------------
+    # STOCK
+    # -----------------------------
+    def stale_stock_version(self) -> Optional[int]:
+        """The stock version to re-read quantities at, or None while cached quantities are current."""
+        with self._lock:
+            self._sync()
+            if self._list is None and not self._items:
+                return None  # nothing cached to correct; a miss reads quantities anyway
+            stock_version = self.current_stock_version()
+            return None if stock_version == self._stock_version else stock_version
+
+    def set_stock(self, stock_version: int, stock: Dict[int, int]):
+        """Overlay id -> quantity on everything cached; the list is re-encoded only if a quantity moved."""
+        with self._lock:
+            items = with_stock(list(self._items.values()), stock)
+            self._items = {item["id"]: item for item in items}
+            if self._list is not None:
+                products = [self._items.get(item["id"], item) for item in self._list]
+                if any(new is not old for new, old in zip(products, self._list)):
+                    self._list = products
+                    self._list_bytes = orjson.dumps(products)
+            self._stock_version = stock_version
+
+    # -----------------------------
+    # LOOKUPS
+    # -----------------------------
+    def get_list(self):
+        """Return (cached_list_or_None, version). Store misses with that version."""
+        with self._lock:
+            version = self._sync()
+            if self._list is not None:
+                self.hits += 1
+                return self._list, version
+            self.misses += 1
+            return None, version
+
+    def get_list_bytes(self):
+        """Like get_list, but returns the list already encoded as JSON."""
+        with self._lock:
+            version = self._sync()
+            if self._list_bytes is not None:
+                self.hits += 1
+                return self._list_bytes, version
+            self.misses += 1
+            return None, version
+
+    def set_list(self, version: int, products: list, stock_version: Optional[int] = None) -> bytes:
+        """stock_version: read before the products were, so their quantities are at least that new."""
+        encoded = orjson.dumps(products)
+        with self._lock:
+            if version == self._version:
+                self._list = products
+                self._list_bytes = encoded
+                self._items = {item["id"]: item for item in products}
+                if stock_version is not None:
+                    self._stock_version = stock_version
+        return encoded
+
+    def get_item(self, product_id: int):
+        with self._lock:
+            version = self._sync()
+            item = self._items.get(product_id)
+            if item is not None:
+                self.hits += 1
+                return item, version
+            self.misses += 1
+            return None, version
+
+    def set_item(self, version: int, item: Dict[str, Any]):
+        with self._lock:
+            if version == self._version:
+                self._items[item["id"]] = item
+
+    def current_items(self, items: list) -> list:
+        """`items` as currently cached (with the latest quantities), e.g. for search index hits."""
+        with self._lock:
+            return [self._items.get(item["id"], item) for item in items]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "pid": os.getpid(),
+                "version": self._version,
+                "stock_version": self._stock_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "cached_items": len(self._items),
+                "list_cached": self._list is not None,
+            }
+
+
+catalog_cache = CatalogCache(CATALOG_VERSION_FILE)
+
+
+async def refresh_stock():
+    """Re-read id/quantity if any worker committed a stock change since this one last looked."""
+    stock_version = catalog_cache.stale_stock_version()
+    if stock_version is None:
+        return
+    async with read_session(not_before=catalog_cache.stock_bumped_at()) as db:
+        stock = dict((await db.execute(select(Product.id, Product.quantity))).all())
+    catalog_cache.set_stock(stock_version, stock)
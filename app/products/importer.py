@@ -0,0 +1,167 @@
+# app/products/importer.py - Bulk catalog import from a CSV/JSON manifest (+ optional image zip)
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cloudinary_setup import CLOUDINARY_WORKERS, MAX_IMAGE_UPLOAD_BYTES, run_on_upload_pool, upload_to_cloudinary
+from app.models import Product
+from app.schemas import ProductCreate, ProductUpdate
+
+IMPORT_BATCH_SIZE = int(os.getenv("PRODUCT_IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ROWS = int(os.getenv("PRODUCT_IMPORT_MAX_ROWS", "20000"))
+IMAGE_COLUMNS = {"image": "image_url", "image2": "image2_url"}
+
+
+def parse_manifest(filename: str, content: bytes) -> List[dict]:
+    try:
+        text = content.decode("utf-8-sig")
+        if filename.lower().endswith(".json"):
+            rows = json.loads(text)
+            if isinstance(rows, dict):
+                rows = rows.get("products", [])
+        else:
+            rows = list(csv.DictReader(io.StringIO(text)))
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse manifest: {e}")
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise HTTPException(status_code=400, detail="Manifest must be a list of product objects")
+
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Manifest exceeds {IMPORT_MAX_ROWS} rows")
+    # CSV gives "" for blank cells and puts cells past the header under a
+    # None key; treat both as missing so schema defaults apply
+    return [{k: v for k, v in row.items() if k is not None and v not in ("", None)} for row in rows]
+
+
+def _open_zip_member(archive: zipfile.ZipFile, name: str) -> UploadFile:
+    info = archive.getinfo(name)
+    if info.file_size > MAX_IMAGE_UPLOAD_BYTES:
+        raise ValueError(f"{name}: image exceeds size limit")
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    with archive.open(info) as member:
+        while chunk := member.read(64 * 1024):
+            spooled.write(chunk)
+    spooled.seek(0)
+    return UploadFile(spooled, filename=os.path.basename(name))
+
+
+async def _upload_row_images(row: dict, archive: Optional[zipfile.ZipFile], folder: str) -> Dict[str, str]:
+    urls = {}
+    for column, field in IMAGE_COLUMNS.items():
+        name = row.get(column)
+        if not name:
+            continue
+        if archive is None:
+            raise ValueError(f"{name}: no images zip uploaded")
+        try:
+            # Decompressing is blocking; keep it off the event loop
+            upload = await run_on_upload_pool(_open_zip_member, archive, name)
+        except KeyError:
+            raise ValueError(f"{name}: not found in images zip")
+        try:
+            urls[field] = await upload_to_cloudinary(upload, folder=folder)
+        except HTTPException as e:
+            raise ValueError(e.detail)
+        finally:
+            await upload.close()
+    return urls
+
+
+async def import_products(
+    db: AsyncSession,
+    rows: List[dict],
+    images: Optional[UploadFile] = None,
+    folder: str = "ekabhumi/products",
+) -> dict:
+    report = [{"row": i + 1, "status": "pending"} for i in range(len(rows))]
+    valid = []  # (row_index, product_id or None, values)
+
+    # 1. Validate every row: new products like create-product, rows with an id
+    #    like update-product (only the provided fields change)
+    for i, row in enumerate(rows):
+        try:
+            product_id = int(row["id"]) if row.get("id") else None
+            if product_id is None:
+                values = ProductCreate(**row).dict()
+            else:
+                values = ProductUpdate(**row).dict(exclude_unset=True)
+            valid.append((i, product_id, values))
+        except (ValidationError, ValueError, TypeError) as e:
+            report[i].update(status="error", errors=str(e))
+
+    # 2. Rows with an id update that product; reject ids that don't exist
+    ids = [pid for _, pid, _ in valid if pid is not None]
+    existing = set()
+    for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+        chunk = ids[start:start + IMPORT_BATCH_SIZE]
+        existing.update((await db.execute(select(Product.id).where(Product.id.in_(chunk)))).scalars())
+    for i, pid, _ in valid:
+        if pid is not None and pid not in existing:
+            report[i].update(status="error", errors=f"Product {pid} not found")
+    valid = [v for v in valid if v[1] is None or v[1] in existing]
+
+    # 3. Upload images concurrently. A row extracts its images only once it
+    #    holds an upload slot, so at most CLOUDINARY_WORKERS rows have files
+    #    spooled at a time instead of the whole zip waiting on the executor
+    try:
+        archive = await run_on_upload_pool(zipfile.ZipFile, images.file) if images else None
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"{images.filename}: not a zip archive")
+    slots = asyncio.Semaphore(CLOUDINARY_WORKERS)
+
+    async def upload_row(row: dict) -> Dict[str, str]:
+        async with slots:
+            return await _upload_row_images(row, archive, folder)
+
+    try:
+        results = await asyncio.gather(
+            *(upload_row(rows[i]) for i, _, _ in valid),
+            return_exceptions=True,
+        )
+    finally:
+        if archive:
+            archive.close()
+
+    inserts, updates, insert_rows = [], [], []
+    for (i, pid, values), urls in zip(valid, results):
+        if isinstance(urls, Exception):
+            report[i].update(status="error", errors=str(urls))
+            continue
+        values.update(urls)
+        if pid is None:
+            inserts.append(values)
+            insert_rows.append(i)
+        else:
+            updates.append({"id": pid, **values})
+            report[i].update(status="updated", id=pid)
+
+    # 4. Batched multi-row statements, all in one transaction
+    try:
+        for start in range(0, len(inserts), IMPORT_BATCH_SIZE):
+            batch = inserts[start:start + IMPORT_BATCH_SIZE]
+            new_ids = (await db.execute(
+                insert(Product).returning(Product.id, sort_by_parameter_order=True), batch
+            )).scalars().all()
+            for row_index, new_id in zip(insert_rows[start:start + IMPORT_BATCH_SIZE], new_ids):
+                report[row_index].update(status="created", id=new_id)
+        for start in range(0, len(updates), IMPORT_BATCH_SIZE):
+            await db.execute(update(Product), updates[start:start + IMPORT_BATCH_SIZE])
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    summary = {"created": 0, "updated": 0, "error": 0}
+    for entry in report:
+        summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+    return {"summary": summary, "rows": report}
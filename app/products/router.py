@@ -1,88 +1,70 @@
 # app/products/router.py - Return real database products
-from fastapi import  APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
+import logging
+from fastapi import  APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_read_db, get_or_primary, read_session
 from app.models import Product
-from fastapi import HTTPException
+from app.products.cache import catalog_cache, refresh_stock, serialize_product
+from app.products.search import search_products
+from fastapi import HTTPException, Response
+from fastapi.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # app/products/router.py
 # ... imports ...
 
+# Cache misses read from a replica only if it has caught up with the last
+# catalog write and stock change; otherwise stale rows would be cached under
+# the new versions. A hit with no stock change since the last look runs no query.
 @router.get("/products")
-def get_products(db: Session = Depends(get_db)):
+async def get_products():
     try:
-        products = db.query(Product).order_by(Product.priority.asc()).all()
-        if not products: return []
-        
-        result = []
-        for product in products:
-            result.append({
-                "id": product.id,
-                "name": product.name,
-                "price": float(product.price) if product.price else 0.0,
-                "description": product.description or "",
-                "quantity": int(product.quantity or 0),
-                "image_url": product.image_url or "",
-                
-                # ✅ NEW: Include image2_url
-                "image2_url": product.image2_url or "",
-                
-                "priority": product.priority or 100
-            })
-        return result
-    except Exception as e:
-        print(f"Error fetching products: {e}")
+        await refresh_stock()
+        # Served as pre-encoded bytes: no per-request dict building or JSON encoding
+        cached, version = catalog_cache.get_list_bytes()
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+
+        stock_version = catalog_cache.current_stock_version()
+        async with read_session(not_before=max(catalog_cache.bumped_at(), catalog_cache.stock_bumped_at())) as db:
+            products = (await db.execute(select(Product).order_by(Product.priority.asc()))).scalars().all()
+        encoded = catalog_cache.set_list(version, [serialize_product(product) for product in products], stock_version)
+        return Response(content=encoded, media_type="application/json")
+    except Exception:
+        logger.exception("Error fetching products")
         return []
 
+@router.get("/products/search")
+async def search_products_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # Declared before /products/{product_id} so "search" isn't parsed as an id
+    items, total = await search_products(db, q, (page - 1) * page_size, page_size)
+    return ORJSONResponse({"items": items, "total": total, "page": page, "page_size": page_size})
+
 @router.get("/products/{product_id}")
-def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(product_id: int):
     try:
-        product = db.query(Product).filter(Product.id == product_id).first()
+        await refresh_stock()
+        cached, version = catalog_cache.get_item(product_id)
+        if cached is not None:
+            return ORJSONResponse(cached)
+
+        async with read_session(not_before=max(catalog_cache.bumped_at(), catalog_cache.stock_bumped_at())) as db:
+            product = await get_or_primary(db, Product, product_id)
         if not product: raise HTTPException(status_code=404, detail="Product not found")
 
-        return {
-            "id": product.id,
-            "name": product.name,
-            "price": float(product.price) if product.price else 0.0,
-            "description": product.description or "",
-            "quantity": int(product.quantity or 0),
-            "image_url": product.image_url or "",
-            
-            # ✅ NEW: Include image2_url
-            "image2_url": product.image2_url or "",
-            
-            "priority": product.priority or 100
-        }
+        result = serialize_product(product)
+        catalog_cache.set_item(version, result)
+        return ORJSONResponse(result)
     except HTTPException: raise
-    except Exception as e:
-        print(f"Error fetching product {product_id}: {e}")
+    except Exception:
+        logger.exception("Error fetching product %s", product_id)
         raise HTTPException(status_code=500, detail="Internal server error")
-        
-    except Exception as e:
-        print(f"Error fetching products: {e}")
-        return []  # Return empty array on error
- 
-@router.get("/products/{product_id}")
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    try:
-        product = db.query(Product).filter(Product.id == product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
-
-        return {
-            "id": product.id,
-            "name": product.name,
-            "price": float(product.price) if product.price else 0.0,
-            "description": product.description or "",
-            "quantity": int(product.quantity or 0),
-            "image_url": product.image_url or "",
-            "priority": product.priority or 100
-        }
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error fetching product {product_id}: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
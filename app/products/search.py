@@ -0,0 +1,131 @@
+# app/products/search.py - Ranked product search over name + description
+#
+# Postgres: full-text match backed by a GIN expression index (migration 5).
+# SQLite/other: an in-process inverted index rebuilt whenever the catalog
+# version changes, so it follows admin create/update/delete on every worker.
+import bisect
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Product
+from app.products.cache import catalog_cache, refresh_stock, serialize_product
+
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Must match the indexed expression in migrations._product_search_index exactly
+SEARCH_DOCUMENT = "to_tsvector('simple', coalesce(products.name, '') || ' ' || coalesce(products.description, ''))"
+
+
+# Inline regconfig literal rather than a bind parameter, which Postgres would type as text
+TS_CONFIG = literal_column("'simple'::regconfig")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class InvertedIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._vocabulary: List[str] = []
+        self._products: Dict[int, dict] = {}
+
+    def rebuild(self, version: int, products: List[dict]):
+        postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for product in products:
+            pid = product["id"]
+            for token in tokenize(product["name"]):
+                postings[token][pid] = postings[token].get(pid, 0.0) + NAME_WEIGHT
+            for token in tokenize(product["description"]):
+                postings[token][pid] = postings[token].get(pid, 0.0) + DESCRIPTION_WEIGHT
+        with self._lock:
+            self.version = version
+            self._postings = dict(postings)
+            self._vocabulary = sorted(postings)
+            self._products = {p["id"]: p for p in products}
+
+    def _matches(self, token: str, prefix: bool) -> Dict[int, float]:
+        if not prefix:
+            return self._postings.get(token, {})
+        # Last token may be partially typed: union of every term it prefixes
+        scores: Dict[int, float] = {}
+        start = bisect.bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            for pid, weight in self._postings[term].items():
+                scores[pid] = max(scores.get(pid, 0.0), weight)
+        return scores
+
+    def search(self, query: str, offset: int, limit: int) -> Tuple[List[dict], int]:
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+        with self._lock:
+            scores = None
+            for i, token in enumerate(tokens):
+                matches = self._matches(token, prefix=(i == len(tokens) - 1))
+                if scores is None:
+                    scores = dict(matches)
+                else:
+                    scores = {pid: s + matches[pid] for pid, s in scores.items() if pid in matches}
+                if not scores:
+                    return [], 0
+            products = self._products
+            ranked = sorted(scores, key=lambda pid: (-scores[pid], products[pid]["priority"], pid))
+            return [products[pid] for pid in ranked[offset:offset + limit]], len(ranked)
+
+
+search_index = InvertedIndex()
+
+
+async def _search_postgres(db: AsyncSession, query: str, offset: int, limit: int):
+    tsquery = func.websearch_to_tsquery(TS_CONFIG, query)
+    document = literal_column(SEARCH_DOCUMENT)
+    weighted = func.setweight(func.to_tsvector(TS_CONFIG, func.coalesce(Product.name, "")), "A").op("||")(
+        func.setweight(func.to_tsvector(TS_CONFIG, func.coalesce(Product.description, "")), "D")
+    )
+    rank = func.ts_rank(weighted, tsquery)
+
+    matched = document.op("@@")(tsquery)
+    total = (await db.execute(select(func.count()).select_from(Product).where(matched))).scalar()
+    products = (await db.execute(
+        select(Product)
+        .where(matched)
+        .order_by(rank.desc(), Product.priority.asc(), Product.id.asc())
+        .offset(offset)
+        .limit(limit)
+    )).scalars().all()
+    return [serialize_product(p) for p in products], total
+
+
+async def _search_in_process(db: AsyncSession, query: str, offset: int, limit: int):
+    if search_index.version != catalog_cache.current_version():
+        products, version = catalog_cache.get_list()
+        if products is None:
+            stock_version = catalog_cache.current_stock_version()
+            rows = (await db.execute(select(Product).order_by(Product.priority.asc()))).scalars().all()
+            products = [serialize_product(p) for p in rows]
+            catalog_cache.set_list(version, products, stock_version)
+        search_index.rebuild(version, products)
+    # The index only follows catalog writes; quantities come from the cache,
+    # which follows stock changes
+    await refresh_stock()
+    items, total = search_index.search(query, offset, limit)
+    return catalog_cache.current_items(items), total
+
+
+async def search_products(db: AsyncSession, query: str, offset: int, limit: int):
+    if db.bind.dialect.name == "postgresql":
+        return await _search_postgres(db, query, offset, limit)
+    return await _search_in_process(db, query, offset, limit)
@@ -82,8 +82,16 @@ class OrderUpdate(BaseModel):
 
 class OrderResponse(OrderBase):
     id: int
+    payment_request_id: Optional[str] = None
+    payment_id: Optional[str] = None
     order_date: datetime
     updated_at: datetime
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class BulkOrderTransition(BaseModel):
+    # Either explicit ids, or none to apply to every order matching the query filters
+    order_ids: Optional[List[int]] = None
+    status: Optional[str] = None
+    payment_status: Optional[str] = None
@@ -0,0 +1,86 @@
+# bench/bench_logging.py - Caller-side logging cost per request
+#
+#   python -m bench.bench_logging
+#
+# One simulated checkout logs three lines (one with a nested payload).
+# Compared: the old print() lines, a synchronous JSON StreamHandler, and the
+# queued handler from app/core/logs.py. Each runs against /dev/null and
+# against a "slow stdout" that takes 1ms per write (a full pipe / slow
+# collector), which is where writing on the request path hurts.
+import io
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from contextlib import redirect_stdout
+
+from app.core import logs
+
+REQUESTS = 2_000
+RESPONSE = {"success": True, "payment_request": {"id": "PR1", "longurl": "https://x", "buyer_phone": "9999999999"}}
+
+
+class SlowStream(io.TextIOBase):
+    def write(self, text):
+        time.sleep(0.001)
+        return len(text)
+
+
+def old_request():
+    print("🔵 [Backend] Received order data:", {"product_id": 1, "customer_phone": "9999999999"})
+    print(f"[PAYMENT] Instamojo rejected: {RESPONSE}")
+    print("✅ [Backend] Order created successfully: Order ID 1")
+
+
+def new_request(logger):
+    logger.info("Creating payment request", extra={"order_id": 1, "amount": "199.00"})
+    logger.warning("Instamojo rejected payment request", extra={"order_id": 1, "response": RESPONSE})
+    logger.info("Order created", extra={"order_id": 1, "product_id": 1, "quantity": 1})
+
+
+def per_request_us(fn, *args) -> float:
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        fn(*args)
+    return (time.perf_counter() - started) / REQUESTS * 1e6
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def run(sink_name, make_sink):
+    with redirect_stdout(make_sink()):
+        printed = per_request_us(old_request)
+
+    sync_handler = logging.StreamHandler(make_sink())
+    sync_handler.setFormatter(logs.JsonFormatter())
+    sync = per_request_us(new_request, make_logger("sync", sync_handler))
+
+    # Same wiring as setup_logging(), pointed at the sink
+    log_queue = queue.SimpleQueue()
+    stream = logging.StreamHandler(make_sink())
+    stream.setFormatter(logs.JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, stream)
+    listener.start()
+    queued = per_request_us(new_request, make_logger("queued", logs.DeferredQueueHandler(log_queue)))
+    drain_started = time.perf_counter()
+    listener.stop()
+    drain = time.perf_counter() - drain_started
+
+    print(f"[{sink_name}] print(): {printed:8.1f} us/request", file=sys.stderr)
+    print(f"[{sink_name}] sync JSON handler: {sync:8.1f} us/request", file=sys.stderr)
+    print(f"[{sink_name}] queued JSON handler: {queued:8.1f} us/request (writer drained in {drain:.2f}s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    logs.trim_log_records()
+    run("devnull", lambda: open(os.devnull, "w"))
+    REQUESTS = 300
+    run("slow stdout 1ms/write", SlowStream)
@@ -0,0 +1,69 @@
+# bench/bench_serialization.py - Per-request JSON encoding cost, before vs after orjson
+#
+#   python -m bench.bench_serialization
+#
+# "before": dicts built per request, then FastAPI's jsonable_encoder + stdlib json
+# "after":  same dicts straight to orjson (ORJSONResponse path)
+# "cached": catalog bytes encoded once and reused (GET /products cache hit)
+import json
+import os
+import timeit
+from datetime import datetime
+from types import SimpleNamespace
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+# Importing app packages builds the engine; no database is touched here
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from app.orders.serializers import serialize_order
+from app.products.cache import serialize_product
+
+SIZES = (100, 1_000, 10_000)
+
+
+def make_products(n):
+    return [
+        SimpleNamespace(
+            id=i, name=f"Product {i}", description="Cold-pressed, small batch " * 3,
+            price=199.0 + i, quantity=i % 50, image_url=f"https://res.cloudinary.com/x/p{i}.jpg",
+            image2_url=None, priority=i % 100,
+        )
+        for i in range(n)
+    ]
+
+
+def make_orders(n):
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(
+            id=i, product_id=i % 40, product_name=f"Product {i % 40}", quantity=1, unit_price=199.0,
+            total_amount=199.0, customer_name="Asha", customer_email=f"c{i}@example.com",
+            customer_phone="9999999999", shipping_address="12 Main Road, Kochi", notes="",
+            status="pending", payment_status="pending", payment_request_id=None, payment_id=None,
+            order_date=now, updated_at=now,
+        )
+        for i in range(n)
+    ]
+
+
+def per_call_ms(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000
+
+
+def main():
+    print(f"{'payload':<10}{'rows':>8}{'before ms':>12}{'after ms':>12}{'cached ms':>12}{'speedup':>10}")
+    for kind, make, serialize in (("products", make_products, serialize_product), ("orders", make_orders, serialize_order)):
+        for n in SIZES:
+            rows = make(n)
+            number = max(1, 2_000 // n)
+            before = per_call_ms(lambda: json.dumps(jsonable_encoder([serialize(r) for r in rows])).encode(), number)
+            after = per_call_ms(lambda: orjson.dumps([serialize(r) for r in rows]), number)
+            cached_bytes = orjson.dumps([serialize(r) for r in rows])
+            cached = per_call_ms(lambda: bytes(cached_bytes), number * 100) if kind == "products" else float("nan")
+            print(f"{kind:<10}{n:>8}{before:>12.3f}{after:>12.3f}{cached:>12.4f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
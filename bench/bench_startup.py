@@ -0,0 +1,159 @@
+# bench/bench_startup.py - Cold start: import time and time to first response
+#
+#   python -m bench.bench_startup                      # compare with bench/startup_baseline.json
+#   python -m bench.bench_startup --save-baseline      # record a new baseline
+#
+# Each run starts a fresh interpreter, so nothing is cached in-process:
+#   import_ms       `python -X importtime -c "import app.main"`, cumulative time of app.main
+#   first_root_ms   spawn uvicorn -> first 200 from GET /
+#   first_db_ms     spawn uvicorn -> first 200 from GET /products (first DB round trip)
+# The database is migrated before the runs, as on a restart of a deployed
+# service. Medians over --runs are compared with the baseline; exits 1 when
+# any of them is more than --max-regression percent slower, so CI can gate on it.
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "bench", "startup_baseline.json")
+METRICS = ("import_ms", "first_root_ms", "first_db_ms")
+
+
+def app_env(db_path: str) -> dict:
+    return {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "startup-bench"),
+        "GOOGLE_CLIENT_ID": os.environ.get("GOOGLE_CLIENT_ID", "startup-bench"),
+        "CATALOG_VERSION_FILE": os.path.join(os.path.dirname(db_path), "catalog_version"),
+        "LOG_LEVEL": "WARNING",
+    }
+
+
+def import_time_ms(env: dict):
+    """Cumulative import time of app.main, plus the slowest top-level imports under it."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    total, top_level = 0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if name.strip() == "app.main":
+            total = int(cumulative) / 1000
+        elif depth == 0:
+            top_level = []  # children print before their parent; drop interpreter startup imports
+        elif depth == 1:
+            top_level.append((int(cumulative) / 1000, name.strip()))
+        if total:
+            break
+    return total, sorted(top_level, reverse=True)[:8]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, proc, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except OSError:
+            time.sleep(0.005)
+    raise RuntimeError(f"{url} not up in time")
+
+
+def first_response_ms(env: dict):
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        deadline = started + 60
+        root = wait_for(f"http://127.0.0.1:{port}/", proc, deadline)
+        db = wait_for(f"http://127.0.0.1:{port}/products", proc, deadline)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return (root - started) * 1000, (db - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=25.0, metavar="PCT")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    env = app_env(db_path)
+    subprocess.run([sys.executable, "-m", "app.migrations"], cwd=ROOT, env=env, check=True, capture_output=True)
+
+    samples = {name: [] for name in METRICS}
+    for _ in range(args.runs):
+        imported, top_level = import_time_ms(env)
+        root, db = first_response_ms(env)
+        samples["import_ms"].append(imported)
+        samples["first_root_ms"].append(root)
+        samples["first_db_ms"].append(db)
+    results = {name: round(statistics.median(values), 1) for name, values in samples.items()}
+
+    print("slowest imports under app.main (last run, cumulative ms):")
+    for ms, name in top_level:
+        print(f"  {ms:8.1f}  {name}")
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+
+    regressions = []
+    print(f"\n{'metric':<16}{'median ms':>10}  vs baseline")
+    for name in METRICS:
+        line = f"{name:<16}{results[name]:>10}"
+        if baseline.get(name):
+            delta = (results[name] - baseline[name]) / baseline[name] * 100
+            line += f"  {delta:+.1f}%"
+            if delta > args.max_regression:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "runs": args.runs,
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+    if regressions:
+        raise SystemExit(f"Startup regressed more than {args.max_regression}%: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# bench/bench_stock.py - Flash-sale checkout against one SKU: no oversell, no lock pile-up
+#
+#   DATABASE_URL=postgresql://... python -m bench.bench_stock --checkouts 500 --stock 100
+#
+# Fires every checkout at once through POST /orders (in-process ASGI, no
+# server needed) and then checks the books: successful orders == stock taken,
+# final quantity never negative, one committed reservation per order.
+# Uses a throwaway SQLite file when DATABASE_URL is unset; point it at
+# Postgres to see real row-lock contention.
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_stock.db")
+# Every checkout comes from one client; the limiter would turn most into 429s
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("SECRET_KEY", "bench-stock")
+os.environ.setdefault("GOOGLE_CLIENT_ID", "bench-stock")
+
+import httpx
+from sqlalchemy import func, select
+
+from app import migrations
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models import Order, Product, StockReservation
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(checkouts: int, stock: int, per_order: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    async with SessionLocal() as db:
+        product = Product(name="Flash sale SKU", description="", price=99.0, quantity=stock)
+        db.add(product)
+        await db.commit()
+        product_id = product.id
+
+    payload = dict(
+        product_id=product_id, product_name="Flash sale SKU", quantity=per_order,
+        unit_price=99.0, total_amount=99.0 * per_order, customer_name="Load",
+        customer_email="load@example.com", customer_phone="9999999999", shipping_address="-",
+    )
+
+    async def checkout(client):
+        started = time.perf_counter()
+        response = await client.post("/orders", json=payload)
+        return response.status_code, time.perf_counter() - started
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(checkout(client) for _ in range(checkouts)))
+        elapsed = time.perf_counter() - started
+
+    codes = {}
+    for code, _ in results:
+        codes[code] = codes.get(code, 0) + 1
+    latencies = [t for _, t in results]
+
+    async with SessionLocal() as db:
+        remaining = await db.scalar(select(Product.quantity).where(Product.id == product_id))
+        orders = await db.scalar(select(func.count()).select_from(Order).where(Order.product_id == product_id))
+        reserved = await db.scalar(
+            select(func.coalesce(func.sum(StockReservation.quantity), 0))
+            .where(StockReservation.product_id == product_id, StockReservation.status == "committed")
+        )
+    await engine.dispose()
+
+    expected_sold = min(checkouts, stock // per_order)
+    print(f"checkouts={checkouts} stock={stock} per_order={per_order} db={engine.dialect.name}")
+    print(f"status codes: {dict(sorted(codes.items()))}")
+    print(f"orders={orders} reserved_units={reserved} remaining={remaining}")
+    print(
+        f"wall={elapsed:.2f}s p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms max={max(latencies) * 1000:.1f}ms "
+        f"mean={statistics.mean(latencies) * 1000:.1f}ms"
+    )
+
+    assert remaining >= 0, "oversold: quantity went negative"
+    assert reserved + remaining == stock, "stock taken does not match reservations"
+    assert orders == codes.get(200, 0) == expected_sold, "accepted orders do not match available stock"
+    assert set(codes) <= {200, 409}, f"unexpected responses: {codes}"
+    print("OK: no oversell")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkouts", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--per-order", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.checkouts, args.stock, args.per_order))
+
+
+if __name__ == "__main__":
+    main()
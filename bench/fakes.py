@@ -0,0 +1,93 @@
+# bench/fakes.py - Local stand-ins for Instamojo and Cloudinary with tunable latency
+#
+#   python -m bench.fakes --port 8900 --instamojo-latency-ms 150 --cloudinary-latency-ms 400
+#
+# Point the app at them with:
+#   INSTAMOJO_BASE_URL=http://127.0.0.1:8900/instamojo/api/1.1/
+#   CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:8900/cloudinary
+#
+# Every payment lookup reports "Credit", so callback/webhook flows complete.
+import argparse
+import asyncio
+import itertools
+import random
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+JITTER = 0.2  # +/- fraction of the configured latency
+
+
+def create_app(instamojo_latency_ms: float = 0, cloudinary_latency_ms: float = 0) -> FastAPI:
+    app = FastAPI()
+    ids = itertools.count(1)
+
+    async def delay(latency_ms: float):
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000 * random.uniform(1 - JITTER, 1 + JITTER))
+
+    # -----------------------------
+    # INSTAMOJO
+    # -----------------------------
+    @app.post("/instamojo/api/1.1/payment-requests/")
+    async def create_payment_request(request: Request):
+        form = await request.form()
+        await delay(instamojo_latency_ms)
+        request_id = f"PR{next(ids)}"
+        return {
+            "success": True,
+            "payment_request": {
+                "id": request_id,
+                "longurl": f"http://fake-instamojo/{request_id}",
+                "amount": form.get("amount"),
+                "purpose": form.get("purpose"),
+            },
+        }
+
+    @app.get("/instamojo/api/1.1/payment-requests/{payment_request_id}/{payment_id}/")
+    async def get_payment(payment_request_id: str, payment_id: str):
+        await delay(instamojo_latency_ms)
+        return {
+            "success": True,
+            "payment_request": {
+                "id": payment_request_id,
+                "payment": {"payment_id": payment_id, "status": "Credit"},
+            },
+        }
+
+    # -----------------------------
+    # CLOUDINARY
+    # -----------------------------
+    @app.post("/cloudinary/v1_1/{cloud_name}/{resource_type}/upload")
+    async def upload(cloud_name: str, resource_type: str, request: Request):
+        form = await request.form()
+        await delay(cloudinary_latency_ms)
+        public_id = form.get("public_id") or f"img{next(ids)}"
+        folder = form.get("folder")
+        path = f"{folder}/{public_id}" if folder else public_id
+        return {
+            "public_id": path,
+            "resource_type": "image",
+            "secure_url": f"https://res.cloudinary.com/{cloud_name}/image/upload/v1/{path}.jpg",
+        }
+
+    @app.post("/cloudinary/v1_1/{cloud_name}/{resource_type}/destroy")
+    async def destroy(cloud_name: str, resource_type: str):
+        await delay(cloudinary_latency_ms)
+        return {"result": "ok"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--instamojo-latency-ms", type=float, default=150)
+    parser.add_argument("--cloudinary-latency-ms", type=float, default=400)
+    args = parser.parse_args()
+    app = create_app(args.instamojo_latency_ms, args.cloudinary_latency_ms)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+# bench/loadtest.py - End-to-end load test against a real uvicorn server
+#
+#   python -m bench.loadtest                                   # SQLite, defaults
+#   python -m bench.loadtest --database-url postgresql://... --orders 1000000 --workers 4
+#   python -m bench.loadtest --save-baseline                   # record bench/baseline.json
+#   python -m bench.loadtest --fail-on-regression 20           # exit 1 if p95/throughput regress >20%
+#
+# Seeds products and orders, starts bench/fakes.py in place of Instamojo and
+# Cloudinary (with tunable latency) and uvicorn serving app.main:app, then
+# drives each scenario with a closed loop of --concurrency clients and reports
+# throughput and p50/p95/p99. Results are compared with the baseline file.
+#
+# Scenarios:
+#   browse        GET /products
+#   detail        GET /products/{id}
+#   checkout      POST /api/payment/create -> GET callback -> POST webhook (one iteration)
+#   admin_orders  GET /admin/orders at a random cursor depth (constant per-page cost)
+#   image_upload  POST /admin/create-product with a small JPEG
+#   import        POST /admin/products/import with --import-rows rows (single request, opt-in)
+import argparse
+import asyncio
+import csv
+import hashlib
+import hmac
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "bench", "baseline.json")
+SCENARIOS = ("browse", "detail", "checkout", "admin_orders", "image_upload")
+SEED_BATCH_SIZE = 5_000
+# Smallest byte string validate_image_upload accepts as a JPEG
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 2048
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None, help="default: throwaway SQLite file")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--fakes-port", type=int, default=8900)
+    parser.add_argument("--instamojo-latency-ms", type=float, default=150)
+    parser.add_argument("--cloudinary-latency-ms", type=float, default=400)
+    parser.add_argument("--import-rows", type=int, default=0, help="also time one product import of N rows")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", type=float, default=None, metavar="PCT")
+    return parser.parse_args()
+
+
+def configure_env(args):
+    """Everything the app reads at import time; set before any app module is imported."""
+    fakes = f"http://127.0.0.1:{args.fakes_port}"
+    # Never picked up from the environment: the run inserts rows and creates products
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/loadtest.db"
+    defaults = {
+        "SECRET_KEY": "loadtest-secret",
+        "GOOGLE_CLIENT_ID": "loadtest",
+        "ADMIN_EMAILS": "loadtest-admin@example.com",
+        "INSTAMOJO_API_KEY": "loadtest",
+        "INSTAMOJO_AUTH_TOKEN": "loadtest",
+        "INSTAMOJO_BASE_URL": f"{fakes}/instamojo/api/1.1/",
+        "CLOUDINARY_CLOUD_NAME": "loadtest",
+        "CLOUDINARY_API_KEY": "loadtest",
+        "CLOUDINARY_API_SECRET": "loadtest",
+        "CLOUDINARY_UPLOAD_PREFIX": f"{fakes}/cloudinary",
+        "CATALOG_VERSION_FILE": os.path.join(tempfile.mkdtemp(), "catalog_version"),
+        # The load generator is one IP; don't measure the limiter rejecting it
+        "RATE_LIMIT_ENABLED": "0",
+        "LOG_LEVEL": "WARNING",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+
+# -----------------------------
+# SEED
+# -----------------------------
+async def seed(products: int, orders: int) -> dict:
+    from sqlalchemy import func, insert, select
+
+    from app import migrations
+    from app.database import SessionLocal, engine
+    from app.models import Order, Product
+    from app.orders.rollup import record_order_changes, snapshot
+
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+
+    rng = random.Random(42)
+    async with SessionLocal() as db:
+        existing = (await db.execute(select(func.count(Product.id)))).scalar()
+        if existing < products:
+            await db.execute(insert(Product), [
+                {
+                    "name": f"Product {i}",
+                    "description": "Seeded by bench/loadtest.py " * 4,
+                    "price": round(rng.uniform(99, 2999), 2),
+                    "quantity": 10_000_000,  # checkout scenario must never run out
+                    "priority": rng.randint(1, 200),
+                    "image_url": f"https://res.cloudinary.com/loadtest/image/upload/v1/p{i}.jpg",
+                }
+                for i in range(existing, products)
+            ])
+            await db.commit()
+        catalog = (await db.execute(select(Product.id, Product.name, Product.price))).all()
+
+        existing = (await db.execute(select(func.count(Order.id)))).scalar()
+        start = datetime.utcnow() - timedelta(days=365)
+        for batch_start in range(existing, orders, SEED_BATCH_SIZE):
+            rows = []
+            for i in range(batch_start, min(orders, batch_start + SEED_BATCH_SIZE)):
+                product_id, name, price = rng.choice(catalog)
+                quantity = rng.randint(1, 3)
+                paid = rng.random() < 0.7
+                placed = start + timedelta(seconds=i * 365 * 86400 // max(orders, 1))
+                rows.append({
+                    "product_id": product_id, "product_name": name, "quantity": quantity,
+                    "unit_price": price, "total_amount": price * quantity,
+                    "customer_name": f"Customer {i % 5000}",
+                    "customer_email": f"customer{i % 5000}@example.com",
+                    "customer_phone": "9999999999", "shipping_address": "1 Bench Street",
+                    "notes": "", "status": "confirmed" if paid else "pending",
+                    "payment_status": "paid" if paid else "pending",
+                    "payment_request_id": f"SEED{i}" if paid else None,
+                    "payment_id": f"SEEDPAY{i}" if paid else None,
+                    "order_date": placed, "updated_at": placed,
+                })
+            await db.execute(insert(Order), rows)
+            # Keep /admin/stats consistent with the seeded orders
+            await record_order_changes(db, [(None, snapshot(_Row(r))) for r in rows])
+            await db.commit()
+        order_ids = (await db.execute(select(func.min(Order.id), func.max(Order.id)))).one()
+
+    await engine.dispose()
+    return {
+        "products": [{"id": p.id, "name": p.name, "price": p.price} for p in catalog],
+        "order_id_range": tuple(order_ids),
+    }
+
+
+class _Row:
+    def __init__(self, values: dict):
+        self.__dict__.update(values)
+
+
+# -----------------------------
+# PROCESSES
+# -----------------------------
+def start_process(argv):
+    return subprocess.Popen(argv, cwd=ROOT, env=os.environ.copy())
+
+
+async def wait_until_up(url: str, proc, timeout: float = 60):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{url} exited with {proc.returncode} during startup")
+            try:
+                await client.get(url, timeout=1)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop_process(proc):
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# -----------------------------
+# SCENARIOS
+# -----------------------------
+def admin_headers() -> dict:
+    from app.core.security import create_access_token
+
+    email = sorted(os.environ["ADMIN_EMAILS"].split(","))[0].strip().lower()
+    return {"Authorization": f"Bearer {create_access_token({'sub': email, 'email': email, 'role': 'admin'})}"}
+
+
+def webhook_mac(fields: dict) -> str:
+    message = "|".join(str(fields[k]) for k in sorted(fields))
+    return hmac.new(os.environ["INSTAMOJO_AUTH_TOKEN"].encode(), message.encode(), hashlib.sha1).hexdigest()
+
+
+def build_scenarios(data: dict):
+    from app.admin.router import encode_cursor
+
+    products = data["products"]
+    low, high = data["order_id_range"]
+    admin = admin_headers()
+    counter = iter(range(10**12))
+
+    async def browse(client):
+        return [await client.get("/products")]
+
+    async def detail(client):
+        return [await client.get(f"/products/{random.choice(products)['id']}")]
+
+    async def checkout(client):
+        product = random.choice(products)
+        created = await client.post("/api/payment/create", json={
+            "product_id": product["id"], "product_name": product["name"], "quantity": 1,
+            "unit_price": product["price"], "total_amount": product["price"],
+            "customer_name": "Load Test", "customer_email": "loadtest@example.com",
+            "customer_phone": "+91 9999999999", "shipping_address": "1 Bench Street",
+        })
+        if created.status_code != 200:
+            return [created]
+        body = created.json()
+        payment_id = f"LTPAY{next(counter)}"
+        callback = await client.get("/api/payment/callback", params={
+            "payment_id": payment_id, "payment_request_id": body["payment_request_id"], "order_id": body["order_id"],
+        })
+        fields = {
+            "payment_id": payment_id, "payment_request_id": body["payment_request_id"],
+            "status": "Credit", "amount": f"{product['price']:.2f}",
+        }
+        webhook = await client.post("/api/payment/webhook", data={**fields, "mac": webhook_mac(fields)})
+        return [created, callback, webhook]
+
+    async def admin_orders(client):
+        params = {"limit": 50}
+        if low is not None:
+            params["cursor"] = encode_cursor(random.randint(low, high + 1))
+        return [await client.get("/admin/orders", params=params, headers=admin)]
+
+    async def image_upload(client):
+        return [await client.post(
+            "/admin/create-product",
+            data={"name": f"Upload {next(counter)}", "price": "199", "description": "-", "priority": "100"},
+            files={"image": ("image.jpg", JPEG, "image/jpeg")},
+            headers=admin,
+        )]
+
+    return {
+        "browse": browse, "detail": detail, "checkout": checkout,
+        "admin_orders": admin_orders, "image_upload": image_upload,
+    }
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+async def run_scenario(client, fn, requests: int, concurrency: int) -> dict:
+    latencies, errors, remaining = [], {}, [requests]
+
+    async def loop():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                responses = await fn(client)
+                bad = [r.status_code for r in responses if r.status_code >= 400]
+            except Exception as e:
+                bad = [type(e).__name__]
+            if bad:
+                errors[str(bad[0])] = errors.get(str(bad[0]), 0) + 1
+            else:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": requests,
+        "ok": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 50), 1),
+        "p95_ms": round(percentile(ordered, 95), 1),
+        "p99_ms": round(percentile(ordered, 99), 1),
+    }
+
+
+async def run_import(client, rows: int) -> dict:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=["name", "price", "description", "quantity", "priority"])
+    writer.writeheader()
+    for i in range(rows):
+        writer.writerow({"name": f"Imported {i}", "price": 100 + i % 900, "description": "-", "quantity": 10, "priority": i % 200})
+    started = time.perf_counter()
+    response = await client.post(
+        "/admin/products/import",
+        files={"manifest": ("products.csv", buffer.getvalue().encode(), "text/csv")},
+        headers=admin_headers(),
+        timeout=600,
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    ok = response.status_code == 200
+    return {
+        "requests": 1, "ok": int(ok),
+        "errors": {} if ok else {str(response.status_code): 1},
+        "rows": rows, "rps": round(rows / (elapsed_ms / 1000), 1),
+        "p50_ms": round(elapsed_ms, 1), "p95_ms": round(elapsed_ms, 1), "p99_ms": round(elapsed_ms, 1),
+    }
+
+
+# -----------------------------
+# REPORT
+# -----------------------------
+def compare(results: dict, baseline: dict, threshold) -> list:
+    """Prints deltas against the baseline; returns the regressions beyond threshold (percent)."""
+    regressions = []
+    print(f"\n{'scenario':<14}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  errors   vs baseline (rps / p95)")
+    for name, r in results.items():
+        line = f"{name:<14}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}  {sum(r['errors'].values()):<7}"
+        base = baseline.get(name)
+        if base and base["rps"] and base["p95_ms"]:
+            rps_delta = (r["rps"] - base["rps"]) / base["rps"] * 100
+            p95_delta = (r["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100
+            line += f"  {rps_delta:+.1f}% / {p95_delta:+.1f}%"
+            if threshold is not None and (rps_delta < -threshold or p95_delta > threshold):
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+async def main():
+    args = parse_args()
+    configure_env(args)
+    sys.path.insert(0, ROOT)
+
+    print(f"Seeding {args.products} products / {args.orders} orders into {os.environ['DATABASE_URL'].split('@')[-1]}")
+    started = time.perf_counter()
+    data = await seed(args.products, args.orders)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    import httpx
+
+    fakes = start_process([
+        sys.executable, "-m", "bench.fakes", "--port", str(args.fakes_port),
+        "--instamojo-latency-ms", str(args.instamojo_latency_ms),
+        "--cloudinary-latency-ms", str(args.cloudinary_latency_ms),
+    ])
+    server = start_process([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ])
+    results = {}
+    try:
+        await wait_until_up(f"http://127.0.0.1:{args.fakes_port}/docs", fakes)
+        await wait_until_up(f"http://127.0.0.1:{args.port}/", server)
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+            scenarios = build_scenarios(data)
+            for name in args.scenarios.split(","):
+                name = name.strip()
+                if name not in scenarios:
+                    raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(scenarios)}")
+                # Warm caches and keep-alive connections outside the measurement
+                await run_scenario(client, scenarios[name], min(args.concurrency, args.requests), args.concurrency)
+                results[name] = await run_scenario(client, scenarios[name], args.requests, args.concurrency)
+                print(f"  {name}: {results[name]['rps']} req/s, p95 {results[name]['p95_ms']} ms")
+            if args.import_rows:
+                results["import"] = await run_import(client, args.import_rows)
+    finally:
+        stop_process(server)
+        stop_process(fakes)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.fail_on_regression)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+                "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline", "fail_on_regression", "database_url")},
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+    if regressions:
+        raise SystemExit(f"Regressed beyond {args.fail_on_regression}%: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
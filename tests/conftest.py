@@ -0,0 +1,44 @@
+# tests/conftest.py - Environment for the test suite, set before the app is imported
+#
+# The app reads its configuration at import time, so everything here has to
+# be in os.environ before the first test module imports app.*. Each run gets
+# a throwaway SQLite primary plus a second file standing in for a read
+# replica that the `replicate` fixture copies the primary into.
+import os
+import sqlite3
+import tempfile
+import time
+
+import pytest
+
+_dir = tempfile.mkdtemp(prefix="ekb-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_dir, 'primary.db')}"
+os.environ["READ_REPLICA_URLS"] = f"sqlite:///{os.path.join(_dir, 'replica.db')}"
+# Replica checks only run when a test asks for one (see replica_check)
+os.environ["DB_REPLICA_CHECK_INTERVAL"] = "3600"
+os.environ["DB_REPLICA_MAX_LAG_SECONDS"] = "5"
+os.environ["CATALOG_VERSION_FILE"] = os.path.join(_dir, "catalog_version")
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ["SECRET_KEY"] = "tests"
+os.environ["GOOGLE_CLIENT_ID"] = "tests"
+os.environ["ADMIN_EMAILS"] = "admin@example.com"
+
+
+@pytest.fixture(scope="session")
+def replicate():
+    """Snapshot the primary into the replica file, dated when the snapshot began (or `taken_at`).
+
+    app/database.py reads a SQLite replica's lag from that date.
+    """
+    from app.database import engine, replicas
+
+    def snapshot(taken_at=None):
+        started = time.time() if taken_at is None else taken_at
+        source, target = sqlite3.connect(engine.url.database), sqlite3.connect(replicas[0].engine.url.database)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        os.utime(replicas[0].engine.url.database, (started, started))
+    return snapshot
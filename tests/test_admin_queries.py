@@ -0,0 +1,83 @@
+# tests/test_admin_queries.py - Query budgets for admin endpoints (assert_max_queries)
+#
+# A page of GET /admin/orders is one keyset SELECT whatever the page size or
+# filters; a lazy load or per-row lookup creeping into the serializer would
+# show up here as queries growing with the page.
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app import migrations
+from app.core.profiling import assert_max_queries
+from app.core.security import create_access_token
+from app.database import SessionLocal, dispose_engines, engine, replicas
+from app.main import app
+from app.models import Order
+
+ORDERS = 120
+ADMIN = {"Authorization": "Bearer " + create_access_token(
+    {"sub": "admin", "email": "admin@example.com", "role": "admin"}
+)}
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(dispose_engines())
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def client(loop, replicate):
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(migrations.upgrade)
+        started = datetime.utcnow() - timedelta(days=1)
+        async with SessionLocal() as db:
+            db.add_all([
+                Order(
+                    product_id=1, product_name="Budget SKU", quantity=1, unit_price=10.0, total_amount=10.0,
+                    customer_name="B", customer_email=f"budget{i % 7}@example.com", customer_phone="9999999999",
+                    shipping_address="-", status=("pending", "confirmed")[i % 2],
+                    payment_status=("pending", "paid")[i % 2], order_date=started + timedelta(minutes=i),
+                )
+                for i in range(ORDERS)
+            ])
+            await db.commit()
+    loop.run_until_complete(seed())
+    # The listing is read-routed: give it a caught-up replica, checked up front
+    # so no lag check lands inside a budget
+    replicate()
+    for replica in replicas:
+        loop.run_until_complete(replica.check())
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test.local")
+    yield client
+    loop.run_until_complete(client.aclose())
+
+
+def get(loop, client, params):
+    response = loop.run_until_complete(client.get("/admin/orders", params=params, headers=ADMIN))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("params", [
+    {"limit": 5},
+    {"limit": 100},
+    {"limit": 50, "status": "confirmed"},
+    {"limit": 50, "payment_status": "pending", "customer_email": "budget3@example.com"},
+])
+def test_admin_orders_page_is_one_query(loop, client, params):
+    with assert_max_queries(1):
+        page = get(loop, client, params)
+    assert page["items"]
+
+
+def test_admin_orders_next_page_is_one_query(loop, client):
+    first = get(loop, client, {"limit": 20})
+    with assert_max_queries(1):
+        second = get(loop, client, {"limit": 20, "cursor": first["next_cursor"]})
+    assert second["items"][0]["id"] < first["items"][-1]["id"]
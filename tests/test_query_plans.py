@@ -0,0 +1,93 @@
+# tests/test_query_plans.py - EXPLAIN QUERY PLAN regression test for the hot queries
+#
+#   python -m pytest tests
+#
+# Builds the schema through the migrations on a throwaway SQLite file and
+# checks that every hot query is answered from an index: no full table scan
+# and no temp B-tree for the ORDER BY. Rename or drop an index these rely on
+# and this fails.
+import tempfile
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from app import migrations
+from app.admin.router import order_filters
+from app.models import Job, Order, Product, StockReservation
+
+
+@pytest.fixture(scope="module")
+def connection():
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/plans.db")
+    with engine.begin() as conn:
+        migrations.upgrade(conn)
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+def query_plan(connection, statement) -> list:
+    sql = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def filters(**values):
+    params = dict(status=None, payment_status=None, customer_email=None, date_from=None, date_to=None)
+    return order_filters(**{**params, **values})
+
+
+HOT_QUERIES = {
+    # GET /products and the in-process search index rebuild
+    "catalog_by_priority": (
+        select(Product).order_by(Product.priority.asc()),
+        "ix_products_priority",
+    ),
+    # GET /orders?email=
+    "orders_by_email": (
+        select(Order).where(Order.customer_email == "shopper@example.com").order_by(Order.id.desc()),
+        "ix_orders_customer_email_id",
+    ),
+    # Payment callback and webhook match
+    "order_by_payment_request": (
+        select(Order).where(Order.payment_request_id == "PR123"),
+        "ux_orders_payment_request_id",
+    ),
+    # GET /admin/orders, next page
+    "admin_orders_page": (
+        select(Order).where(Order.id < 5000).order_by(Order.id.desc()).limit(51),
+        "INTEGER PRIMARY KEY",
+    ),
+    "admin_orders_by_status": (
+        select(Order).where(*filters(status="pending"), Order.id < 5000).order_by(Order.id.desc()).limit(51),
+        "ix_orders_status_id",
+    ),
+    "admin_orders_by_payment_status": (
+        select(Order).where(*filters(payment_status="paid")).order_by(Order.id.desc()).limit(51),
+        "ix_orders_payment_status_id",
+    ),
+    "admin_orders_by_email": (
+        select(Order).where(*filters(customer_email="shopper@example.com")).order_by(Order.id.desc()).limit(51),
+        "ix_orders_customer_email_id",
+    ),
+    # Job worker claim and the expired-hold sweeper
+    "jobs_due": (
+        select(Job.id).where(Job.status == "queued", Job.run_at <= datetime(2030, 1, 1)).order_by(Job.run_at),
+        "ix_jobs_status_run_at",
+    ),
+    "expired_holds": (
+        select(StockReservation.order_id)
+        .where(StockReservation.status == "held", StockReservation.expires_at <= datetime(2030, 1, 1))
+        .order_by(StockReservation.expires_at),
+        "ix_stock_reservations_status_expires_at",
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(connection, name):
+    statement, index = HOT_QUERIES[name]
+    plan = query_plan(connection, statement)
+    assert any(index in step for step in plan), plan
+    assert not any(step.startswith("SCAN") and "USING" not in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
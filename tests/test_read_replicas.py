@@ -0,0 +1,147 @@
+# tests/test_read_replicas.py - Read/write routing against a two-file SQLite "replica"
+#
+# The primary is one SQLite file; the replica is a second file that the
+# replicate fixture (tests/conftest.py) refreshes from the primary and stamps
+# with the snapshot time, which app/database.py reads as its lag. Requests go through the app
+# in-process (ASGI). Replica checks run only when a test calls replica_check,
+# so every routing decision here is deterministic.
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app import migrations
+from app.database import DB_REPLICA_MAX_LAG_SECONDS, SessionLocal, dispose_engines, engine, replicas
+from app.main import app
+from app.models import Product
+
+def order_payload(product_id, email):
+    return dict(
+        product_id=product_id, product_name="Replica SKU", quantity=1, unit_price=10.0,
+        total_amount=10.0, customer_name="R", customer_email=email,
+        customer_phone="9999999999", shipping_address="-",
+    )
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(dispose_engines())
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def served():
+    """Order queries per engine; the routing layer's own lag checks don't count."""
+    counts = {"primary": 0, "replica": 0}
+
+    def counter(name):
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if "FROM orders" in statement:
+                counts[name] += 1
+        return listener
+
+    listeners = [(engine.sync_engine, counter("primary")), (replicas[0].engine.sync_engine, counter("replica"))]
+    for target, listener in listeners:
+        event.listen(target, "before_cursor_execute", listener)
+    yield counts
+    for target, listener in listeners:
+        event.remove(target, "before_cursor_execute", listener)
+
+
+@pytest.fixture(scope="module")
+def product_id(loop):
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(migrations.upgrade)
+        async with SessionLocal() as db:
+            product = Product(name="Replica SKU", description="", price=10.0, quantity=10_000)
+            db.add(product)
+            await db.commit()
+            return product.id
+    return loop.run_until_complete(setup())
+
+
+@pytest.fixture
+def replica_check(loop):
+    def check():
+        loop.run_until_complete(replicas[0].check())
+    return check
+
+
+@pytest.fixture
+def client(loop):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test.local")
+    yield client
+    loop.run_until_complete(client.aclose())
+
+
+@pytest.fixture
+def other_client(loop):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test.local")
+    yield client
+    loop.run_until_complete(client.aclose())
+
+
+def served_by(loop, served, client, path) -> str:
+    before = dict(served)
+    response = loop.run_until_complete(client.get(path))
+    assert response.status_code == 200, response.text
+    return "replica" if served["replica"] > before["replica"] else "primary"
+
+
+def post_order(loop, client, product_id, email) -> int:
+    response = loop.run_until_complete(client.post("/orders", json=order_payload(product_id, email)))
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_caught_up_replica_serves_reads(loop, replicate, served, product_id, client, replica_check):
+    replicate()
+    replica_check()
+    assert served_by(loop, served, client, "/orders?email=nobody@example.com") == "replica"
+
+
+def test_read_your_writes(loop, replicate, served, product_id, client, replica_check):
+    replicate()
+    replica_check()
+    order_id = post_order(loop, client, product_id, "rw@example.com")
+    assert "db_wrote_at" in client.cookies, "no read-your-writes cookie"
+
+    # The replica predates the write: this client reads from the primary
+    assert loop.run_until_complete(client.get(f"/orders/{order_id}")).status_code == 200
+    listed = loop.run_until_complete(client.get("/orders", params={"email": "rw@example.com"})).json()
+    assert [o["id"] for o in listed] == [order_id]
+    assert served_by(loop, served, client, "/orders?email=rw@example.com") == "primary"
+
+    # Once the replica has copied past the write, the writer reads from it again
+    replicate()
+    replica_check()
+    assert served_by(loop, served, client, "/orders?email=rw@example.com") == "replica"
+
+
+def test_lookup_by_id_falls_back_to_primary_on_replica_miss(loop, replicate, served, product_id, client, other_client, replica_check):
+    replicate()
+    replica_check()
+    order_id = post_order(loop, client, product_id, "miss@example.com")
+
+    # No cookie: routed to the replica, which hasn't seen the order yet
+    before = dict(served)
+    response = loop.run_until_complete(other_client.get(f"/orders/{order_id}"))
+    assert response.status_code == 200, response.text
+    assert response.json()["id"] == order_id
+    assert served["replica"] > before["replica"] and served["primary"] > before["primary"]
+
+
+def test_lagging_replica_is_skipped(loop, replicate, served, product_id, other_client, replica_check):
+    replicate(taken_at=time.time() - DB_REPLICA_MAX_LAG_SECONDS - 1)
+    replica_check()
+    assert replicas[0].lag > DB_REPLICA_MAX_LAG_SECONDS
+    assert served_by(loop, served, other_client, "/orders?email=x@example.com") == "primary"
+
+    replicate()
+    replica_check()
+    assert served_by(loop, served, other_client, "/orders?email=x@example.com") == "replica"